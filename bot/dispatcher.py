@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from django.db import close_old_connections
+from bot.tg.dc import Message, UpdateObj
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDispatcher:
+    """
+    Handles the updates of different chats concurrently on a bounded thread pool,
+    the updates of one chat one after another in the order of their update_id.
+
+    `offset` confirms to Telegram only the updates whose handling has finished,
+    so the updates still in progress are delivered again after a restart.
+    With `ordered` false the updates may come in any order of update_id, each one once
+    (the webhook inbox), and `on_done` gets the update_id of every finished update
+    """
+    def __init__(
+        self, handler: Callable[[Message], None], workers: int, ordered: bool = True,
+        on_done: Optional[Callable[[int], None]] = None,
+    ):
+        self.handler = handler
+        self.ordered = ordered
+        self.on_done = on_done
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot-dispatcher")
+        self.lock = threading.Condition()
+        # Chat id -> its pending updates, the first one is being handled
+        self.chats: dict[int, deque[UpdateObj]] = {}
+        self.in_progress: set[int] = set()
+        self.last_update_id = -1
+        self.processed = 0
+        self.failed = 0
+        # Time and processed count of the previous metrics
+        self._reported = (time.monotonic(), 0)
+
+    @property
+    def offset(self) -> int:
+        """Offset of the next getUpdates: the oldest unfinished update, or the one after the last update"""
+        with self.lock:
+            return self._offset()
+
+    def _offset(self) -> int:
+        return min(self.in_progress) if self.in_progress else self.last_update_id + 1
+
+    def submit(self, updates: list[UpdateObj]) -> int:
+        """Queues the updates not seen before, returns their number"""
+        new, skipped = 0, []
+        with self.lock:
+            for update in updates:
+                # An offset held by an unfinished update brings the later ones again
+                if update.update_id in self.in_progress or self.ordered and update.update_id <= self.last_update_id:
+                    continue
+                self.last_update_id = max(self.last_update_id, update.update_id)
+                new += 1
+                if update.message is None:
+                    self.processed += 1
+                    skipped.append(update.update_id)
+                    continue
+                self.in_progress.add(update.update_id)
+                queue = self.chats.setdefault(update.message.chat.id, deque())
+                queue.append(update)
+                if len(queue) == 1:
+                    self.executor.submit(self._run_chat, update.message.chat.id)
+        if self.on_done:
+            for update_id in skipped:
+                self.on_done(update_id)
+        return new
+
+    def _run_chat(self, chat_id: int):
+        """Handles the queue of the chat until it is empty"""
+        while True:
+            with self.lock:
+                update = self.chats[chat_id][0]
+            try:
+                self.handler(update.message)
+                failed = 0
+            except Exception:
+                # A failing update must not hold the offset of every later one
+                logger.exception("Update %s of chat %s failed", update.update_id, chat_id)
+                failed = 1
+            finally:
+                close_old_connections()
+            if self.on_done:
+                self.on_done(update.update_id)
+
+            with self.lock:
+                self.chats[chat_id].popleft()
+                self.in_progress.discard(update.update_id)
+                self.processed += 1
+                self.failed += failed
+                self.lock.notify_all()
+                if not self.chats[chat_id]:
+                    del self.chats[chat_id]
+                    return
+
+    def wait_for_offset(self, offset: int, timeout: float) -> bool:
+        """Waits until the offset moves past the given one, False when the timeout passed first"""
+        with self.lock:
+            return self.lock.wait_for(lambda: self._offset() != offset, timeout)
+
+    def wait_idle(self, timeout: float | None = None) -> bool:
+        """Waits until every queued update is handled"""
+        with self.lock:
+            return self.lock.wait_for(lambda: not self.in_progress, timeout)
+
+    def metrics(self) -> dict:
+        """Counters, backlog and throughput since the previous call"""
+        with self.lock:
+            now = time.monotonic()
+            since, processed = self._reported
+            self._reported = (now, self.processed)
+            return {
+                "processed": self.processed,
+                "failed": self.failed,
+                "backlog": len(self.in_progress),
+                "active_chats": len(self.chats),
+                "throughput": round((self.processed - processed) / max(now - since, 1e-9), 2),
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,68 @@
+import datetime
+import threading
+import time
+from django.utils import timezone
+from bot.models import TgUpdate
+from bot.tg.dc import GetUpdatesResponse, UpdateObj
+
+# Seconds between the deletions of the handled updates past their keep time
+PRUNE_INTERVAL = 60
+
+
+def receive_update(data: dict):
+    """Stores an update of the webhook, an update delivered again is dropped"""
+    update = UpdateObj.Schema().load(data)
+    TgUpdate.objects.bulk_create([TgUpdate(update_id=update.update_id, data=data)], ignore_conflicts=True)
+
+
+class WebhookInbox:
+    """
+    Updates received by the webhook. Webhook calls commit in any order of update_id, so
+    every unhandled update is returned once whatever its update_id, and only the updates
+    reported by `finish` are marked handled, with one query by the next get_updates.
+    Handled updates are kept `keep_seconds` to drop the ones telegram delivers again
+    """
+    def __init__(self, poll_interval: float, keep_seconds: int, batch_size: int = 100):
+        self.poll_interval = poll_interval
+        self.keep_seconds = keep_seconds
+        self.batch_size = batch_size
+        self.pruned = time.monotonic()
+        self.lock = threading.Lock()
+        # Update ids returned and not marked handled yet, and the finished ones among them
+        self.dispatched: set[int] = set()
+        self.finished: set[int] = set()
+
+    def finish(self, update_id: int):
+        """Reports the update handled, called by the dispatcher"""
+        with self.lock:
+            self.finished.add(update_id)
+
+    def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
+        """Unhandled updates not returned before, the offset of the polling is not used"""
+        with self.lock:
+            finished, self.finished = self.finished, set()
+        if finished:
+            TgUpdate.objects.filter(update_id__in=finished).update(handled=True)
+            with self.lock:
+                self.dispatched -= finished
+        if time.monotonic() - self.pruned >= PRUNE_INTERVAL:
+            self.prune()
+
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.lock:
+                dispatched = list(self.dispatched)
+            rows = list(TgUpdate.objects.filter(handled=False).exclude(update_id__in=dispatched).order_by(
+                "update_id"
+            ).values_list("update_id", "data")[:self.batch_size])
+            if rows or time.monotonic() >= deadline:
+                with self.lock:
+                    self.dispatched.update(update_id for update_id, _ in rows)
+                return GetUpdatesResponse(ok=True, result=[UpdateObj.Schema().load(data) for _, data in rows])
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+
+    def prune(self):
+        self.pruned = time.monotonic()
+        TgUpdate.objects.filter(
+            handled=True, created__lt=timezone.now() - datetime.timedelta(seconds=self.keep_seconds)
+        ).delete()
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+from bot.outbox import get_outbox_sender
+
+
+class Command(BaseCommand):
+    help = "send the queued telegram messages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="exit when no message is due")
+
+    def handle(self, *args, **options):
+        sender = get_outbox_sender()
+        if options["once"]:
+            while sender.send_pending():
+                pass
+        else:
+            sender.run(settings.OUTBOX_POLL_INTERVAL)
+        self.stdout.write(f"{sender.sent} messages sent, {sender.failed} failed")
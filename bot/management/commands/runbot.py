@@ -1,9 +1,15 @@
+import threading
+import time
 from enum import auto
 from enum import Flag
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from bot.dispatcher import UpdateDispatcher
+from bot.inbox import WebhookInbox
 from bot.models import TgUser
-from bot.tg.client import TgClient
+from bot.outbox import enqueue, get_outbox_sender
+from bot.state import get_state_store
+from bot.tg.client import TgClient, get_tg_client
 from bot.tg.dc import Message
 from goals.models import Goal
 from goals.models import GoalCategory
@@ -22,19 +28,70 @@ class Command(BaseCommand):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.tg_client = TgClient(settings.BOT_TOKEN)
-        self.states_storage = {}
-        self.goals_for_create = {}
+        self.tg_client = get_tg_client()
+        self.states = get_state_store()
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.BOT_WORKERS, help="chats handled at the same time")
+        parser.add_argument("--no-outbox", action="store_true", help="leave the replies to a run_outbox process")
+        parser.add_argument("--webhook", action="store_true", help="handle the updates received by bot/webhook")
 
     def handle(self, *args, **options):
         """Enter when command Start"""
-        offset = 0
+        updates = self.get_update_source(options["webhook"])
+        if isinstance(updates, WebhookInbox):
+            dispatcher = UpdateDispatcher(
+                self.handle_message, options["workers"], ordered=False, on_done=updates.finish
+            )
+        else:
+            dispatcher = UpdateDispatcher(self.handle_message, options["workers"])
+        sender = None if options["no_outbox"] else get_outbox_sender()
+        if sender:
+            threading.Thread(
+                target=sender.run, args=(settings.OUTBOX_POLL_INTERVAL,), name="bot-outbox", daemon=True
+            ).start()
+        reported = time.monotonic()
+        try:
+            while True:
+                offset = dispatcher.offset
+                # getUpdates and the webhook inbox confirm the handled updates, their states are written before
+                self.states.flush()
+                res = updates.get_updates(offset=offset)
+                if res.result and not dispatcher.submit(res.result):
+                    # Only the updates still in progress came again, poll when the oldest one is done
+                    dispatcher.wait_for_offset(offset, timeout=settings.BOT_METRICS_INTERVAL)
+                if time.monotonic() - reported >= settings.BOT_METRICS_INTERVAL:
+                    reported = time.monotonic()
+                    metrics = dispatcher.metrics()
+                    if sender:
+                        metrics |= {"sent": sender.sent, "send_failed": sender.failed}
+                    self.stdout.write(" ".join(f"{key}={value}" for key, value in metrics.items()))
+        finally:
+            dispatcher.shutdown()
+            self.states.flush()
+            if sender:
+                sender.stop()
+
+    def get_update_source(self, webhook: bool) -> TgClient | WebhookInbox:
+        """Telegram long polling, or the webhook inbox after the webhook is set"""
+        if not webhook:
+            # getUpdates does not work while a webhook is set
+            self.tg_client.delete_webhook()
+            return self.tg_client
+        if not settings.BOT_WEBHOOK_URL or not settings.BOT_WEBHOOK_SECRET:
+            raise CommandError("BOT_WEBHOOK_URL and BOT_WEBHOOK_SECRET are required for --webhook")
+        self.tg_client.set_webhook(
+            settings.BOT_WEBHOOK_URL, settings.BOT_WEBHOOK_SECRET, settings.BOT_WEBHOOK_MAX_CONNECTIONS
+        )
+        return WebhookInbox(settings.BOT_WEBHOOK_POLL_INTERVAL, settings.BOT_WEBHOOK_KEEP_SECONDS)
+
+    def get_state(self, tg_id: int) -> tuple[States | None, dict]:
+        """State of the chat with the user and its data"""
+        value = self.states.get(tg_id)
+        return (States[value[0]], value[1]) if value else (None, {})
 
-        while True:
-            res = self.tg_client.get_updates(offset=offset)
-            for item in res.result:
-                offset = item.update_id + 1
-                self.handle_message(item.message)
+    def set_state(self, tg_id: int, state: States, data: dict | None = None):
+        self.states.set(tg_id, state.name, data)
 
     def handle_message(self, message: Message):
         """Handle all messages"""
@@ -48,19 +105,21 @@ class Command(BaseCommand):
         tg_user_id = message.from_.id
 
         # States
+        stored_state, data = self.get_state(tg_user_id)
         if created:
-            self.states_storage[tg_user_id] = States.start
+            state = States.start
         elif not tg_user.user:
-            self.states_storage[tg_user_id] = States.verification
-        elif (
-            self.states_storage.get(tg_user_id, States.verification)
-            == States.verification
-        ):
-            self.states_storage[tg_user_id] = States.idle
-
-        match self.states_storage.get(tg_user_id, States.idle):
+            state = States.verification
+        elif stored_state in (None, States.verification):
+            state = States.idle
+        else:
+            state = stored_state
+        if state != stored_state:
+            self.set_state(tg_user_id, state)
+
+        match state:
             case States.start:
-                self.tg_client.send_message(message.chat.id, "Привет!")
+                enqueue(message.chat.id, "Привет!")
             case States.verification:
                 self.verification_state(message, tg_user)
             case States.idle:
@@ -68,13 +127,13 @@ class Command(BaseCommand):
             case States.input_cat_for_create_goal:
                 self.input_cat_for_create_goal_state(message, tg_user)
             case States.input_title_for_create_goal:
-                self.input_title_for_create_goal_state(message, tg_user)
+                self.input_title_for_create_goal_state(message, tg_user, data)
 
     def verification_state(self, message: Message, tg_user: TgUser):
         """Send verification code"""
         tg_user.set_verification_code()
         tg_user.save(update_fields=["verification_code"])
-        self.tg_client.send_message(
+        enqueue(
             message.chat.id,
             f"Код подтверждения -> {tg_user.verification_code}",
         )
@@ -84,94 +143,89 @@ class Command(BaseCommand):
         if message.text == "/goals":
             self.send_tasks(message, tg_user)
         elif message.text == "/create":
-            self.states_storage[
-                tg_user.tg_id
-            ] = States.input_cat_for_create_goal
+            self.set_state(tg_user.tg_id, States.input_cat_for_create_goal)
             self.send_all_categories(message, tg_user)
         else:
-            self.tg_client.send_message(
+            enqueue(
                 message.chat.id, "Неизвестная команда"
             )
 
     def send_tasks(self, message: Message, tg_user: TgUser):
         """Send all user's task"""
-        goals = Goal.objects.filter(
+        goals = Goal.objects.visible_to(tg_user.user).filter(
             user=tg_user.user, category__is_deleted=False
         ).exclude(status=Goal.Status.archived)
         if goals.count() > 0:
             msg = "\n".join(f"#{goal.id} {goal.title}" for goal in goals)
-            self.tg_client.send_message(message.chat.id, msg)
+            enqueue(message.chat.id, msg)
         else:
-            self.tg_client.send_message(
+            enqueue(
                 message.chat.id, "У вас нет целей"
             )
 
     def send_all_categories(self, message: Message, tg_user: TgUser):
         """Send all user's categories"""
-        categories = GoalCategory.objects.filter(
-            board__participants__user=tg_user.user, is_deleted=False
-        )
+        categories = GoalCategory.objects.visible_to(tg_user.user).filter(is_deleted=False)
         if categories.count() > 0:
             msg = (
                 "Выберите категорию (введите название категории)\n"
                 + "\n".join(f"#{cat.id} `{cat.title}`" for cat in categories)
             )
-            self.tg_client.send_message(
+            enqueue(
                 message.chat.id, msg, parse_mode="Markdown"
             )
         else:
-            self.tg_client.send_message(
+            enqueue(
                 message.chat.id, "У вас нет категорий"
             )
-            self.states_storage[tg_user.tg_id] = States.idle
+            self.set_state(tg_user.tg_id, States.idle)
 
     def input_cat_for_create_goal_state(self, message: Message, tg_user: TgUser):
         """Wait while user input category name for create goal (1 step)"""
         if message.text == "/cancel":
-            self.goals_for_create.pop(tg_user.tg_id, None)
             self.cancel(message, tg_user)
             return
 
-        category = GoalCategory.objects.filter(
+        category = GoalCategory.objects.visible_to(tg_user.user).filter(
             title=message.text,
-            board__participants__user=tg_user.user,
             is_deleted=False,
         ).first()
-        self.goals_for_create[tg_user.tg_id] = {"cat": None}
         if category:
-            self.goals_for_create[tg_user.tg_id]["cat"] = category
-            self.tg_client.send_message(
+            enqueue(
                 message.chat.id, "Отлично!\nТеперь придумайте название цели"
             )
-            self.states_storage[
-                tg_user.tg_id
-            ] = States.input_title_for_create_goal
+            self.set_state(tg_user.tg_id, States.input_title_for_create_goal, {"category": category.id})
             return
         else:
-            self.tg_client.send_message(
+            enqueue(
                 message.chat.id,
                 "У вас нет такой категории :V\nПопробуйте еще раз",
             )
 
-    def input_title_for_create_goal_state(self, message: Message, tg_user: TgUser):
+    def input_title_for_create_goal_state(self, message: Message, tg_user: TgUser, data: dict):
         """Wait while user input title for create goal (2 step)"""
         if message.text == "/cancel":
-            self.goals_for_create.pop(tg_user.tg_id, None)
             self.cancel(message, tg_user)
             return
 
-        category: GoalCategory = self.goals_for_create[tg_user.tg_id]["cat"]
+        category = GoalCategory.objects.visible_to(tg_user.user).filter(
+            pk=data.get("category"), is_deleted=False
+        ).first()
+        if not category:
+            enqueue(message.chat.id, "Категория удалена")
+            self.set_state(tg_user.tg_id, States.idle)
+            return
         goal = Goal.objects.create(
             user=category.user, title=message.text, category=category
         )
-        self.tg_client.send_message(
+        enqueue(
             message.chat.id,
             "Ваша цель создана:\n"
-            + f"http://84.201.176.215/boards/{category.board.id}/goals?goal={goal.id}",
+            + f"http://84.201.176.215/boards/{category.board_id}/goals?goal={goal.id}",
         )
-        self.states_storage[tg_user.tg_id] = States.idle
+        self.set_state(tg_user.tg_id, States.idle)
 
     def cancel(self, message: Message, tg_user: TgUser):
         """Return user to idle state"""
-        self.tg_client.send_message(message.chat.id, "Операция отменена")
-        self.states_storage[tg_user.tg_id] = States.idle
+        enqueue(message.chat.id, "Операция отменена")
+        self.set_state(tg_user.tg_id, States.idle)
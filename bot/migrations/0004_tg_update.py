@@ -0,0 +1,28 @@
+# Generated by Django 4.2.1 on 2026-10-18 21:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bot', '0003_outbox_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TgUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('update_id', models.BigIntegerField(unique=True, verbose_name='update id')),
+                ('data', models.JSONField(verbose_name='Данные')),
+                ('handled', models.BooleanField(default=False, verbose_name='Обработано')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Обновление telegram',
+                'verbose_name_plural': 'Обновления telegram',
+                'indexes': [models.Index(condition=models.Q(('handled', True)), fields=['created'], name='tg_update_handled_idx')],
+            },
+        ),
+    ]
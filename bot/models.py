@@ -1,6 +1,8 @@
 import string
 import random
+from typing import Tuple
 from django.db import models
+from django.utils import timezone
 from core.models import User
 
 
@@ -18,3 +20,59 @@ class TgUser(models.Model):
 
     def set_verification_code(self):
         self.verification_code = "".join(random.choice(string.ascii_letters + string.digits) for _ in range(12))
+
+
+class TgState(models.Model):
+    """Conversation state of the bot with a telegram user, see bot.state.DbStateStore"""
+    tg_id = models.BigIntegerField(verbose_name="tg id", unique=True)
+    state = models.CharField(max_length=64, verbose_name="Состояние")
+    data = models.JSONField(verbose_name="Данные", default=dict, blank=True)
+    updated = models.DateTimeField(auto_now=True, verbose_name="Дата последнего обновления")
+
+    class Meta:
+        verbose_name: str = "Состояние бота"
+        verbose_name_plural: str = "Состояния бота"
+
+
+class OutboxMessage(models.Model):
+    """Message waiting to be sent to telegram by the outbox sender, see bot.outbox"""
+    class Meta:
+        verbose_name: str = "Исходящее сообщение"
+        verbose_name_plural: str = "Исходящие сообщения"
+        indexes: Tuple[models.Index, ...] = (
+            # Pending messages polled by the sender
+            models.Index(fields=["id"], name="outbox_pending_idx", condition=models.Q(status=1)),
+        )
+
+    class Status(models.IntegerChoices):
+        pending = 1, "Ожидает"
+        sent = 2, "Отправлено"
+        failed = 3, "Ошибка"
+
+    chat_id = models.BigIntegerField(verbose_name="tg chat id")
+    text = models.TextField(verbose_name="Текст")
+    parse_mode = models.CharField(max_length=16, verbose_name="Разметка", null=True, blank=True, default=None)
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.pending)
+    # Claimed and deferred messages wait for this time, a claim left by a stopped sender expires with it
+    send_after = models.DateTimeField(verbose_name="Отправить после", default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(verbose_name="Попытки", default=0)
+    error = models.TextField(verbose_name="Ошибка", blank=True)
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated = models.DateTimeField(auto_now=True, verbose_name="Дата последнего обновления")
+
+
+class TgUpdate(models.Model):
+    """Update received by the webhook, see bot.inbox.WebhookInbox"""
+    class Meta:
+        verbose_name: str = "Обновление telegram"
+        verbose_name_plural: str = "Обновления telegram"
+        indexes: Tuple[models.Index, ...] = (
+            # Handled updates pruned by their age
+            models.Index(fields=["created"], name="tg_update_handled_idx", condition=models.Q(handled=True)),
+        )
+
+    # Unique to drop the updates delivered again
+    update_id = models.BigIntegerField(verbose_name="update id", unique=True)
+    data = models.JSONField(verbose_name="Данные")
+    handled = models.BooleanField(verbose_name="Обработано", default=False)
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
@@ -0,0 +1,174 @@
+import datetime
+import logging
+import threading
+import time
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from bot.models import OutboxMessage
+from bot.tg.client import TgClient, TgUncertainError, get_tg_client
+
+logger = logging.getLogger(__name__)
+
+# Set by the messages queued in this process, wakes its sender before the poll interval
+_enqueued = threading.Event()
+
+
+def enqueue(chat_id: int, text: str, parse_mode: str | None = None) -> OutboxMessage:
+    """Queues the message for the outbox sender, it is sent after the current transaction commits"""
+    message = OutboxMessage.objects.create(chat_id=chat_id, text=text, parse_mode=parse_mode)
+    transaction.on_commit(_enqueued.set)
+    return message
+
+
+class TokenBucket:
+    """`rate` tokens per second, at most `capacity` of them saved up for a burst"""
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self.refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def take(self, now: float):
+        self.refill(now)
+        self.tokens -= 1
+
+
+class OutboxSender:
+    """
+    Sends the pending outbox messages within a global and a per-chat rate limit of telegram.
+    The messages of one chat are sent in the order of their id: a message over the limit
+    of its chat is put off with the later ones of the chat while the other chats go on.
+    A failed message is retried with a growing delay up to `max_attempts` times, a message
+    telegram may have got already is marked failed at once so that it is not sent twice
+    """
+    def __init__(
+        self, client: TgClient, rate: float, chat_rate: float, chat_burst: int, batch_size: int,
+        max_attempts: int, retry_delay: float, lease: float,
+    ):
+        self.client = client
+        self.rate = rate
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.bucket = TokenBucket(rate, rate, time.monotonic())
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        # Chat id -> monotonic time before which a failed message of the chat holds the later ones
+        self.held: dict[int, float] = {}
+        self.sent = 0
+        self.failed = 0
+        self.stopped = threading.Event()
+
+    def claim(self) -> list[OutboxMessage]:
+        """
+        Takes the due messages and moves their send_after past the lease, so other senders skip them
+        and a sender stopped in the middle leaves them to the next one
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            messages = list(OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxMessage.Status.pending, send_after__lte=now
+            ).order_by("id")[:self.batch_size])
+            OutboxMessage.objects.filter(id__in=[message.id for message in messages]).update(
+                send_after=now + datetime.timedelta(seconds=self.lease)
+            )
+        return messages
+
+    def send_pending(self) -> int:
+        """Sends the claimed batch, returns the number of claimed messages"""
+        messages = self.claim()
+        # Chat id -> seconds its messages left in the batch are put off, and their ids
+        deferred: dict[int, tuple[float, list[int]]] = {}
+        for message in messages:
+            now = time.monotonic()
+            if message.chat_id not in deferred and not self.stopped.is_set():
+                chat_bucket = self.chat_buckets.setdefault(
+                    message.chat_id, TokenBucket(self.chat_rate, self.chat_burst, now)
+                )
+                wait = max(chat_bucket.wait_time(now), self.held.get(message.chat_id, now) - now)
+                if wait <= 0:
+                    # Over the global limit every chat waits, this smooths a burst out
+                    self.stopped.wait(self.bucket.wait_time(now))
+                    now = time.monotonic()
+                    self.bucket.take(now)
+                    chat_bucket.take(now)
+                    self.send(message)
+                    continue
+                deferred[message.chat_id] = (wait, [])
+            deferred.setdefault(message.chat_id, (0, []))[1].append(message.id)
+
+        now = timezone.now()
+        for wait, ids in deferred.values():
+            OutboxMessage.objects.filter(id__in=ids).update(send_after=now + datetime.timedelta(seconds=wait))
+        self.prune(time.monotonic())
+        return len(messages)
+
+    def send(self, message: OutboxMessage):
+        try:
+            self.client.send_message(message.chat_id, message.text, parse_mode=message.parse_mode)
+        except Exception as e:
+            message.attempts += 1
+            message.error = str(e)
+            if message.attempts >= self.max_attempts or isinstance(e, TgUncertainError):
+                logger.exception("Outbox message %s failed", message.id)
+                message.status = OutboxMessage.Status.failed
+                self.failed += 1
+            else:
+                delay = self.retry_delay * 2 ** (message.attempts - 1)
+                logger.warning("Outbox message %s failed: %s, retry in %.1f s", message.id, e, delay)
+                message.send_after = timezone.now() + datetime.timedelta(seconds=delay)
+                self.held[message.chat_id] = time.monotonic() + delay
+        else:
+            message.attempts += 1
+            message.status = OutboxMessage.Status.sent
+            self.sent += 1
+        message.save(update_fields=("status", "send_after", "attempts", "error", "updated"))
+
+    def prune(self, now: float):
+        """Forgets the chats back to their full burst and the expired holds"""
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.chat_buckets[chat_id]
+        for chat_id in [chat_id for chat_id, until in self.held.items() if until <= now]:
+            del self.held[chat_id]
+
+    def run(self, poll_interval: float):
+        """Sends the messages until stopped"""
+        while not self.stopped.is_set():
+            _enqueued.clear()
+            try:
+                claimed = self.send_pending()
+            except Exception:
+                logger.exception("Outbox sending failed")
+                claimed = 0
+            finally:
+                close_old_connections()
+            if claimed < self.batch_size:
+                _enqueued.wait(poll_interval)
+
+    def stop(self):
+        self.stopped.set()
+        _enqueued.set()
+
+
+def get_outbox_sender() -> OutboxSender:
+    """Outbox sender of the OUTBOX_* settings"""
+    return OutboxSender(
+        get_tg_client(), rate=settings.OUTBOX_RATE, chat_rate=settings.OUTBOX_CHAT_RATE,
+        chat_burst=settings.OUTBOX_CHAT_BURST, batch_size=settings.OUTBOX_BATCH_SIZE,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS, retry_delay=settings.OUTBOX_RETRY_DELAY,
+        lease=settings.OUTBOX_LEASE_SECONDS,
+    )
@@ -0,0 +1,118 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from django.conf import settings
+from bot.models import TgState
+
+# (state name, data of the state)
+StateValue = tuple[str, dict]
+
+
+class StateStore(ABC):
+    """Conversation state of the bot chats by telegram user id"""
+    @abstractmethod
+    def get(self, tg_id: int) -> Optional[StateValue]:
+        """State of the user, None when the user has none"""
+
+    @abstractmethod
+    def set(self, tg_id: int, state: str, data: Optional[dict] = None):
+        pass
+
+    def flush(self):
+        """Writes the buffered states"""
+
+
+class MemoryStateStore(StateStore):
+    """
+    States in the process memory, at most `max_size` of the recently used ones,
+    each one forgotten `ttl` seconds after its last change
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # tg id -> (expiry time, state, data), the least recently used first
+        self.states: OrderedDict[int, tuple[float, str, dict]] = OrderedDict()
+
+    def get(self, tg_id: int) -> Optional[StateValue]:
+        with self.lock:
+            item = self.states.get(tg_id)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self.states[tg_id]
+                return None
+            self.states.move_to_end(tg_id)
+            return item[1], item[2]
+
+    def set(self, tg_id: int, state: str, data: Optional[dict] = None):
+        with self.lock:
+            self.states[tg_id] = (time.monotonic() + self.ttl, state, data or {})
+            self.states.move_to_end(tg_id)
+            while len(self.states) > self.max_size:
+                self.states.popitem(last=False)
+
+
+class DbStateStore(StateStore):
+    """
+    States in the TgState table, shared by the bot processes and kept over restarts.
+    Changes are buffered and upserted with one query per `batch_size` changes or per
+    `flush_interval` seconds. Reads go to the table, so a state written by another
+    process is seen at once. One flush runs at a time, and the states it writes are
+    read from memory until they are in the table
+    """
+    def __init__(self, batch_size: int, flush_interval: float):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending: dict[int, StateValue] = {}
+        # States taken by the running flush
+        self.writing: dict[int, StateValue] = {}
+        self.flushed = time.monotonic()
+
+    def get(self, tg_id: int) -> Optional[StateValue]:
+        with self.lock:
+            if tg_id in self.pending:
+                return self.pending[tg_id]
+            if tg_id in self.writing:
+                return self.writing[tg_id]
+        return TgState.objects.filter(tg_id=tg_id).values_list("state", "data").first()
+
+    def set(self, tg_id: int, state: str, data: Optional[dict] = None):
+        with self.lock:
+            self.pending[tg_id] = (state, data or {})
+            due = len(self.pending) >= self.batch_size or time.monotonic() - self.flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        # A flush started later waits, so an older state never overwrites a newer one
+        with self.flush_lock:
+            with self.lock:
+                self.writing, self.pending = self.pending, {}
+                self.flushed = time.monotonic()
+            if not self.writing:
+                return
+            try:
+                TgState.objects.bulk_create(
+                    [TgState(tg_id=tg_id, state=state, data=data) for tg_id, (state, data) in self.writing.items()],
+                    update_conflicts=True, unique_fields=["tg_id"], update_fields=["state", "data", "updated"],
+                )
+            except Exception:
+                # Newer changes of the same users stay in front of the failed ones
+                with self.lock:
+                    self.pending = self.writing | self.pending
+                raise
+            finally:
+                with self.lock:
+                    self.writing = {}
+
+
+def get_state_store() -> StateStore:
+    """State store of the BOT_STATE_STORE setting"""
+    if settings.BOT_STATE_STORE == "memory":
+        return MemoryStateStore(settings.BOT_STATE_CACHE_SIZE, settings.BOT_STATE_TTL)
+    return DbStateStore(settings.BOT_STATE_BATCH_SIZE, settings.BOT_STATE_FLUSH_INTERVAL)
@@ -1,25 +1,128 @@
+import logging
+import random
+import threading
+import time
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 from bot.tg.dc import GetUpdatesResponse, SendMessageResponse
 
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES: tuple[int, ...] = (429, 500, 502, 503, 504)
+# Methods safe to repeat after a timeout, telegram may have done the others already
+IDEMPOTENT_METHODS: tuple[str, ...] = ("getUpdates", "getMe", "setWebhook", "deleteWebhook")
+
+
+class TgApiError(Exception):
+    """Telegram API call failed after the retries"""
+
+
+class TgUncertainError(TgApiError):
+    """The request reached telegram but no response came, the call may have been done"""
+
+
+def is_unsent(error: requests.RequestException) -> bool:
+    """The connection failed before the request was sent"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # requests wraps the urllib3 MaxRetryError, whose reason is the connect error
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
 
 class TgClient:
-    def __init__(self, token):
+    """
+    Telegram Bot API client on one keep-alive session with a connection pool.
+    Connection errors, 429 and 5xx responses are retried with a jittered exponential
+    backoff, 429 waits `retry_after` seconds when Telegram sends it. A timeout or a lost
+    connection after the request was sent is retried only for IDEMPOTENT_METHODS,
+    repeating sendMessage would send the message twice
+    """
+    def __init__(
+        self, token, pool_size: int = 10, connect_timeout: float = 5, read_timeout: float = 10, retries: int = 3,
+        backoff: float = 0.5, max_retry_delay: float = 10, api_url: str = "https://api.telegram.org",
+    ):
         self.token = token
+        self.api_url = api_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_retry_delay = max_retry_delay
+        self.session = requests.Session()
+        self.session.mount(api_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
 
     def get_url(self, method: str):
-        return f"https://api.telegram.org/bot{self.token}/{method}"
+        return f"{self.api_url}/bot{self.token}/{method}"
 
     def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdatesResponse:
-        url = self.get_url("getUpdates")
-        resp = requests.get(url, params={"offset": offset, "timeout": timeout})
-        return GetUpdatesResponse.Schema().load(resp.json())
+        # The long poll holds the response for up to `timeout` seconds
+        data = self.request("get", "getUpdates", params={"offset": offset, "timeout": timeout}, long_poll=timeout)
+        return GetUpdatesResponse.Schema().load(data)
 
     def send_message(self, chat_id: int, text: str, parse_mode: str | None = None) -> SendMessageResponse:
-        url = self.get_url("sendMessage")
-
         json_data = {"chat_id": chat_id, "text": text}
         if parse_mode and parse_mode in ["MarkdownV2", "HTML", "Markdown"]:
             json_data |= {"parse_mode": parse_mode}
 
-        resp = requests.post(url, json=json_data)
-        return SendMessageResponse.Schema().load(resp.json())
\ No newline at end of file
+        return SendMessageResponse.Schema().load(self.request("post", "sendMessage", json=json_data))
+
+    def set_webhook(self, url: str, secret_token: str, max_connections: int = 40) -> dict:
+        """Sends the new messages to the url, getUpdates stops working until delete_webhook"""
+        return self.request("post", "setWebhook", json={
+            "url": url, "secret_token": secret_token, "max_connections": max_connections,
+            "allowed_updates": ["message"],
+        })
+
+    def delete_webhook(self) -> dict:
+        return self.request("post", "deleteWebhook")
+
+    def request(self, http_method: str, method: str, long_poll: float = 0, **kwargs) -> dict:
+        """JSON of a successful response of the API method"""
+        timeout = (self.connect_timeout, self.read_timeout + long_poll)
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self.session.request(http_method, self.get_url(method), timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if method not in IDEMPOTENT_METHODS and not is_unsent(e):
+                    raise TgUncertainError(f"{method} failed: {e}") from e
+                error, delay = e, self.get_backoff(attempt)
+            else:
+                if resp.status_code not in RETRY_STATUSES:
+                    return resp.json()
+                error, delay = f"HTTP {resp.status_code}", self.get_retry_delay(resp, attempt)
+
+            if attempt == self.retries or delay > self.max_retry_delay:
+                raise TgApiError(f"{method} failed: {error}")
+            logger.warning("%s failed: %s, retry in %.1f s", method, error, delay)
+            time.sleep(delay)
+
+    def get_backoff(self, attempt: int) -> float:
+        return self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+    def get_retry_delay(self, resp: requests.Response, attempt: int) -> float:
+        if resp.status_code == 429:
+            try:
+                return float(resp.json()["parameters"]["retry_after"])
+            except (ValueError, KeyError, TypeError):
+                pass
+        return self.get_backoff(attempt)
+
+
+_client: TgClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_tg_client() -> TgClient:
+    """TgClient of the process, shared by the bot workers and the API views"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = TgClient(
+                settings.BOT_TOKEN, pool_size=settings.TG_POOL_SIZE, connect_timeout=settings.TG_CONNECT_TIMEOUT,
+                read_timeout=settings.TG_READ_TIMEOUT, retries=settings.TG_RETRIES, backoff=settings.TG_BACKOFF,
+                max_retry_delay=settings.TG_MAX_RETRY_DELAY, api_url=settings.TG_API_URL,
+            )
+        return _client
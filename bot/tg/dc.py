@@ -43,7 +43,8 @@ class Message:
 @dataclass
 class UpdateObj:
     update_id: int
-    message: Message
+    # Empty for the updates other than new messages
+    message: Message | None = None
 
     class Meta:
         unknown = EXCLUDE
@@ -1,11 +1,17 @@
+from secrets import compare_digest
+
 from django.conf import settings
+from marshmallow import ValidationError as SchemaValidationError
 from rest_framework import permissions
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from rest_framework.generics import GenericAPIView
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from bot.inbox import receive_update
 from bot.models import TgUser
 from bot.serializers import TgUserSerializer
-from bot.tg.client import TgClient
+from bot.outbox import enqueue
 
 
 class VerificationView(GenericAPIView):
@@ -23,7 +29,25 @@ class VerificationView(GenericAPIView):
 
         instance_s = self.get_serializer(tg_user)
 
-        tg_client = TgClient(settings.BOT_TOKEN)
-        tg_client.send_message(tg_user.tg_chat_id, "Вход прошел успешно!")
+        enqueue(tg_user.tg_chat_id, "Вход прошел успешно!")
+
+        return Response(instance_s.data)
+
+
+class WebhookView(APIView):
+    """Updates of telegram in the webhook mode, handled later by `runbot --webhook`"""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes: list = []
+
+    def post(self, request, *args, **kwargs):
+        secret = settings.BOT_WEBHOOK_SECRET
+        if not secret:
+            raise NotFound
+        if not compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret):
+            raise PermissionDenied
 
-        return Response(instance_s.data)
\ No newline at end of file
+        try:
+            receive_update(request.data)
+        except SchemaValidationError as e:
+            raise ValidationError(e.messages)
+        return Response()
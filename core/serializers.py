@@ -28,7 +28,6 @@ class SignUpSerializer(serializers.ModelSerializer):
             # del validated_data["password_repeat"]
             validated_data["password"] = make_password(validated_data["password"])
             user = User.objects.create(**validated_data)
-            user.save()
             return user
 
 
@@ -54,12 +53,13 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 
 class PasswordUpdateSerializer(serializers.ModelSerializer):
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     old_password = serializers.CharField(write_only=True)
     new_password = serializers.CharField(write_only=True, validators=[validate_password])
 
     class Meta:
         model = User
-        fields: Tuple[str, ...] = ("old_password", "new_password",)
+        fields: Tuple[str, ...] = ("user", "old_password", "new_password",)
 
     def validate(self, validated_data: dict) -> Dict:
         if not (user := validated_data['user']):
@@ -70,5 +70,5 @@ class PasswordUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance: User, validated_data: Dict) -> User:
         instance.password = make_password(validated_data['new_password'])
-        instance.save()
+        instance.save(update_fields=('password',))
         return instance
@@ -13,14 +13,14 @@ class GoalCategoryAdmin(admin.ModelAdmin):
 class GoalAdmin(admin.ModelAdmin):
     list_display = ["user", "category", "title", "status", "priority", "due_date"]
     list_filter = ["status", "priority", "due_date"]
-    readonly_fields = ["created", "updated"]
+    readonly_fields = ["created", "updated", "board"]
 
 
 @admin.register(GoalComment)
 class GoalCommentAdmin(admin.ModelAdmin):
     list_display = ["goal", "user", "created", "updated"]
     search_fields = ["goal__title"]
-    readonly_fields = ["created", "updated"]
+    readonly_fields = ["created", "updated", "board"]
 
 
 @admin.register(Board)
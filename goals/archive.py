@@ -0,0 +1,92 @@
+import datetime
+import logging
+from typing import Iterator, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from goals.models import ArchiveJob, Goal, GoalCategory, change_goal_counts
+from goals.versions import bump_boards
+
+logger = logging.getLogger(__name__)
+
+
+def claim_job() -> Optional[ArchiveJob]:
+    """
+    Takes the oldest pending job, or a running one whose worker stopped updating it.
+    Concurrent workers skip the jobs locked by each other
+    """
+    stale = timezone.now() - datetime.timedelta(seconds=settings.ARCHIVE_JOB_STALE_SECONDS)
+    with transaction.atomic():
+        job = ArchiveJob.objects.select_for_update(skip_locked=True).filter(
+            Q(status=ArchiveJob.Status.pending) | Q(status=ArchiveJob.Status.running, updated__lt=stale)
+        ).order_by("status", "id").first()
+        if job:
+            job.status = ArchiveJob.Status.running
+            job.save(update_fields=("status", "updated"))
+    return job
+
+
+def archive_in_batches(queryset, batch_size: int, **values) -> Iterator[int]:
+    """
+    Updates the rows of the queryset batch by batch, each batch in its own short transaction,
+    and yields the number of rows updated so far. The update must take the rows out of the queryset.
+    A batch of goals also changes the goal counters
+    """
+    count = 0
+    while True:
+        with transaction.atomic():
+            if queryset.model is Goal:
+                # Locked until the batch commits, so a concurrent write of the goals cannot count them again
+                goals = list(queryset.select_for_update().order_by("id").values_list(
+                    "id", "category_id", "board_id", "status"
+                )[:batch_size])
+                ids = [goal[0] for goal in goals]
+                change_goal_counts(
+                    (goal[1:], (*goal[1:3], values.get("status", goal[3]))) for goal in goals
+                )
+            else:
+                ids = list(queryset.values_list("id", flat=True)[:batch_size])
+            if not ids:
+                return
+            count += queryset.model.objects.filter(id__in=ids).update(updated=timezone.now(), **values)
+        yield count
+
+
+def run_job(job: ArchiveJob, batch_size: int):
+    """Archives the goals (and for a board the categories) of the job, records the progress after every batch"""
+    try:
+        if job.category_id is None:
+            categories = GoalCategory.objects.filter(board_id=job.board_id, is_deleted=False)
+            for _ in archive_in_batches(categories, batch_size, is_deleted=True):
+                bump_boards(job.board_id)
+            goals = Goal.objects.filter(board_id=job.board_id)
+        else:
+            goals = Goal.objects.filter(category_id=job.category_id)
+        goals = goals.exclude(status=Goal.Status.archived)
+
+        # A job resumed after a stopped worker keeps its progress
+        job.total = job.processed + goals.count()
+        job.save(update_fields=("total", "updated"))
+        processed = job.processed
+        for count in archive_in_batches(goals, batch_size, status=Goal.Status.archived):
+            job.processed = processed + count
+            job.save(update_fields=("processed", "updated"))
+            bump_boards(job.board_id)
+
+        job.status = ArchiveJob.Status.done
+        job.save(update_fields=("status", "updated"))
+    except Exception as e:
+        logger.exception("Archive job %s failed", job.id)
+        job.status = ArchiveJob.Status.failed
+        job.error = str(e)
+        job.save(update_fields=("status", "error", "updated"))
+
+
+def run_pending_jobs(batch_size: int) -> int:
+    """Runs the jobs until none is left, returns their number"""
+    count = 0
+    while job := claim_job():
+        run_job(job, batch_size)
+        count += 1
+    return count
@@ -0,0 +1,70 @@
+import hashlib
+from typing import Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from goals.versions import get_user_board_versions
+
+
+class BoardVersionMixin:
+    """
+    Tag of the response built from the versions of the boards it depends on.
+    A write to any of the boards (or a change of the user's boards) makes a new tag
+    """
+    def get_board_versions(self, request: Request) -> Optional[dict[int, int]]:
+        """Versions of the boards of the response, None when the response cannot be tagged"""
+        return get_user_board_versions(request.user)
+
+    def get_version_tag(self, request: Request) -> Optional[str]:
+        if not hasattr(self, "_version_tag"):
+            versions = self.get_board_versions(request)
+            if versions is None:
+                self._version_tag = None
+            else:
+                raw = "|".join([
+                    str(request.user.id),
+                    request.build_absolute_uri(),
+                    ",".join(f"{board_id}:{versions[board_id]}" for board_id in sorted(versions)),
+                ])
+                self._version_tag = hashlib.sha1(raw.encode()).hexdigest()
+        return self._version_tag
+
+
+class CachedListMixin(BoardVersionMixin):
+    """Caches the list responses per user and URL under the version tag of the user's boards"""
+    cache_timeout: int = settings.RESPONSE_CACHE_TIMEOUT
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        key = f"goals:response:{type(self).__name__}:{self.get_version_tag(request)}"
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+
+class ConditionalGetMixin(BoardVersionMixin):
+    """
+    Strong ETag of GET responses from the version tag.
+    A matching If-None-Match gets 304 before the queryset and the serializer run
+    """
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        tag = self.get_version_tag(request)
+        if tag is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = f'"{tag}"'
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = etag
+        return response
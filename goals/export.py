@@ -0,0 +1,48 @@
+import csv
+import json
+from typing import Iterator
+from django.core.serializers.json import DjangoJSONEncoder
+from goals.models import Goal, GoalComment
+
+CHUNK_SIZE: int = 2000
+GOAL_FIELDS: tuple[str, ...] = (
+    "id", "category_id", "title", "description", "status", "priority", "due_date", "user__username", "created",
+    "updated",
+)
+COMMENT_FIELDS: tuple[str, ...] = ("id", "goal_id", "text", "user__username", "created", "updated")
+CSV_COLUMNS: tuple[str, ...] = ("type", *dict.fromkeys(GOAL_FIELDS + COMMENT_FIELDS))
+
+
+def iter_rows(board_id: int) -> Iterator[dict]:
+    """Goals and then comments of the board as plain dicts, fetched in chunks without model instances"""
+    goals = Goal.objects.filter(board_id=board_id).order_by("id").values(*GOAL_FIELDS)
+    for row in goals.iterator(chunk_size=CHUNK_SIZE):
+        yield {"type": "goal", **row}
+    comments = GoalComment.objects.filter(board_id=board_id).order_by("id").values(*COMMENT_FIELDS)
+    for row in comments.iterator(chunk_size=CHUNK_SIZE):
+        yield {"type": "comment", **row}
+
+
+def iter_ndjson(board_id: int) -> Iterator[str]:
+    for row in iter_rows(board_id):
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+class _Line:
+    """File-like object returning the line written by csv.writer instead of buffering it"""
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_csv(board_id: int) -> Iterator[str]:
+    writer = csv.DictWriter(_Line(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for row in iter_rows(board_id):
+        yield writer.writerow(row)
+
+
+# Export type -> (line generator, content type, file extension)
+EXPORT_TYPES: dict = {
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+    "csv": (iter_csv, "text/csv", "csv"),
+}
@@ -1,8 +1,18 @@
+import re
 import django_filters
-from django.db import models
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, models
+from django.db.models import F, FloatField, QuerySet
+from django.db.models.functions import Cast
 from django_filters import rest_framework
+from rest_framework.filters import SearchFilter
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from goals.models import Goal
 
+# Text search configuration of Goal.search_vector, see migration 0011
+SEARCH_CONFIG: str = "simple"
+
 
 class GoalDateFilter(rest_framework.FilterSet):
     class Meta:
@@ -12,4 +22,37 @@ class GoalDateFilter(rest_framework.FilterSet):
             "category": ("exact", "in"),
             "status": ("exact", "in"),
             "priority": ("exact", "in"),
-        }
\ No newline at end of file
+        }
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    PostgreSQL full-text search with prefix matching and ranking.
+    Uses the stored `search_vector_field` of the view when it is set and
+    builds the vector from `search_fields` otherwise; on other databases
+    it falls back to the ILIKE search of SearchFilter
+    """
+    def filter_queryset(self, request: Request, queryset: QuerySet, view) -> QuerySet:
+        if connections[queryset.db].vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+
+        words = [word for term in self.get_search_terms(request) for word in re.findall(r"\w+", term)]
+        if not words:
+            return queryset
+
+        query = SearchQuery(" & ".join(f"{word}:*" for word in words), config=SEARCH_CONFIG, search_type="raw")
+        vector_field = getattr(view, "search_vector_field", None)
+        if vector_field:
+            vector = F(vector_field)
+        else:
+            vector = SearchVector(*self.get_search_fields(view, request), config=SEARCH_CONFIG)
+            vector_field = "search_document"
+            queryset = queryset.annotate(search_document=vector)
+
+        # double precision keeps the rank stable when it is passed back in a pagination cursor
+        queryset = queryset.filter(**{vector_field: query}).annotate(
+            search_rank=Cast(SearchRank(vector, query), FloatField())
+        )
+        if api_settings.ORDERING_PARAM in request.query_params:
+            return queryset
+        return queryset.order_by("-search_rank", *queryset.query.order_by)
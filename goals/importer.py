@@ -0,0 +1,109 @@
+import csv
+import itertools
+import json
+from typing import Callable, Iterable, Iterator, Optional
+from django.db import transaction
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from core.models import User
+from goals.models import BoardParticipant, Goal, GoalCategory, change_goal_counts
+from goals.serializers import GoalImportRowSerializer
+from goals.versions import bump_boards
+
+IMPORT_TYPES: tuple[str, ...] = ("ndjson", "csv")
+# Content type of the request body of every import type, other bodies may be buffered by django
+IMPORT_CONTENT_TYPES: dict[str, str] = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def iter_records(lines: Iterable[str], import_type: str) -> Iterator[tuple[int, object, Optional[dict]]]:
+    """(row number, record, parse errors) of every non-empty NDJSON line or CSV row"""
+    if import_type == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # Empty cells are missing values, cells beyond the header are dropped
+            yield reader.line_num, {key: value for key, value in record.items() if key and value}, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line), None
+        except ValueError:
+            yield number, None, {"non_field_errors": ["Invalid JSON"]}
+
+
+class GoalImporter:
+    """
+    Imports goals in chunks. The rows of a chunk are validated together, their
+    categories, authors and memberships are looked up with one query each
+    and the valid rows are inserted with one bulk_create
+    """
+    def __init__(self, user: User, chunk_size: int, can_write: Callable[[int], bool]):
+        # Author of the rows without a `user` column
+        self.user = user
+        self.chunk_size = chunk_size
+        # Write permission of the importing user on a board
+        self.can_write = can_write
+        self.row_serializer = GoalImportRowSerializer()
+
+    def run(self, records: Iterable[tuple[int, object, Optional[dict]]]) -> Iterator[dict]:
+        """Imports the records, yields the progress and the errors of every chunk"""
+        rows = created = failed = 0
+        records = iter(records)
+        while chunk := list(itertools.islice(records, self.chunk_size)):
+            chunk_created, errors = self.import_chunk(chunk)
+            rows += len(chunk)
+            created += chunk_created
+            failed += len(errors)
+            yield {"rows": rows, "created": created, "failed": failed, "errors": errors}
+
+    def import_chunk(self, chunk: list[tuple[int, object, Optional[dict]]]) -> tuple[int, list[dict]]:
+        errors, valid = [], []
+        for number, record, parse_errors in chunk:
+            if parse_errors:
+                errors.append({"row": number, "errors": parse_errors})
+                continue
+            try:
+                valid.append((number, self.row_serializer.run_validation(record)))
+            except ValidationError as e:
+                errors.append({"row": number, "errors": e.detail})
+
+        categories = GoalCategory.objects.filter(is_deleted=False).in_bulk({attrs["category"] for _, attrs in valid})
+        usernames = {attrs["user"] for _, attrs in valid if "user" in attrs}
+        users = User.objects.in_bulk(usernames, field_name="username") if usernames else {}
+        members = set(BoardParticipant.objects.filter(
+            board_id__in={category.board_id for category in categories.values()}, user__in=users.values()
+        ).values_list("board_id", "user_id")) if users else set()
+
+        goals = []
+        for number, attrs in valid:
+            category = categories.get(attrs.pop("category"))
+            username = attrs.pop("user", None)
+            author = users.get(username) if username else self.user
+            if not category:
+                errors.append({"row": number, "errors": {"category": ["Category not found"]}})
+            elif not self.can_write(category.board_id):
+                errors.append({"row": number, "errors": {"category": [str(PermissionDenied.default_detail)]}})
+            elif not author:
+                errors.append({"row": number, "errors": {"user": ["User not found"]}})
+            elif username and (category.board_id, author.id) not in members:
+                errors.append({"row": number, "errors": {"user": ["User is not a participant of the board"]}})
+            else:
+                goals.append(Goal(user=author, category=category, board_id=category.board_id, **attrs))
+
+        with transaction.atomic():
+            Goal.objects.bulk_create(goals)
+            change_goal_counts([(None, goal.get_counter_key()) for goal in goals])
+            # Bulk queries do not send model signals
+            bump_boards(*{goal.board_id for goal in goals})
+        errors.sort(key=lambda error: error["row"])
+        return len(goals), errors
+
+
+def iter_progress_lines(progress: Iterable[dict]) -> Iterator[str]:
+    """NDJSON lines of the chunk progress and of the final totals"""
+    totals = {"rows": 0, "created": 0, "failed": 0}
+    for chunk in progress:
+        totals = {key: chunk[key] for key in totals}
+        yield json.dumps(chunk) + "\n"
+    yield json.dumps({"done": True, **totals}) + "\n"
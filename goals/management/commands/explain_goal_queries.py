@@ -0,0 +1,69 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.models import User
+from goals.models import GoalCategory
+from goals.views import BoardListView, GoalCategoryListView, GoalListView
+
+# (name, view, query parameters, indexes expected in the plan), None is replaced with a category of the user
+QUERIES: tuple = (
+    ("goal list", GoalListView, {"status__in": "1,2,3"},
+     ("goal_board_status_idx", "goal_active_board_due_idx")),
+    ("goal list by due date", GoalListView, {"status__in": "1,2,3", "due_date__lte": "2000-01-01"},
+     ("goal_active_board_due_idx",)),
+    ("goal list by category", GoalListView, {"category": None, "status": "1"}, ("goal_category_status_idx",)),
+    ("category list", GoalCategoryListView, {}, ("category_active_title_idx",)),
+    ("board list", BoardListView, {}, ("participant_user_board_idx",)),
+)
+
+
+class Command(BaseCommand):
+    help = "print EXPLAIN of the list endpoint queries and check that they use the list indexes"
+    page_size: int = 100
+
+    def add_arguments(self, parser):
+        parser.add_argument("username", help="user whose boards are listed")
+        parser.add_argument(
+            "--no-seqscan", action="store_true",
+            help="disable sequential scans (PostgreSQL), to check the indexes on a small database",
+        )
+        parser.add_argument("--check", action="store_true", help="fail when an expected index is not used")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["username"]).first()
+        if not user:
+            raise CommandError(f"User {options['username']} not found")
+
+        missing = []
+        with transaction.atomic():
+            if options["no_seqscan"] and connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            category = GoalCategory.objects.visible_to(user).filter(is_deleted=False).first()
+            for name, view_class, params, indexes in QUERIES:
+                if None in params.values():
+                    if not category:
+                        self.stdout.write(f"-- {name}: skipped, the user has no categories\n")
+                        continue
+                    params = {key: category.id if value is None else value for key, value in params.items()}
+                # Sliced like a page of the pagination, the planner counts on the LIMIT
+                plan = self.get_queryset(view_class, user, params)[:self.page_size].explain()
+                used = [index for index in indexes if index in plan]
+                if not used:
+                    missing.append(name)
+                self.stdout.write(f"-- {name}: {', '.join(used) if used else 'NOT using ' + ' or '.join(indexes)}")
+                self.stdout.write(f"{plan}\n")
+
+        if options["check"] and missing:
+            raise CommandError(f"Indexes are not used by: {', '.join(missing)}")
+
+    @staticmethod
+    def get_queryset(view_class, user: User, params: dict):
+        """Queryset of the list view after its filters, as it is built for the request"""
+        request = APIRequestFactory().get("/", params)
+        force_authenticate(request, user)
+        view = view_class()
+        view.setup(request)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+        return view.filter_queryset(view.get_queryset())
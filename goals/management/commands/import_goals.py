@@ -0,0 +1,41 @@
+import json
+import sys
+from contextlib import nullcontext
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from core.models import User
+from goals.importer import IMPORT_TYPES, GoalImporter, iter_records
+from goals.membership import WRITE_ROLES
+from goals.models import BoardParticipant
+
+
+class Command(BaseCommand):
+    help = "import goals from an NDJSON or CSV file in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON or CSV file, - reads stdin")
+        parser.add_argument("--user", required=True, help="author of the rows without a user column")
+        parser.add_argument("--type", choices=IMPORT_TYPES, help="input type, by default the file extension")
+        parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE, help="rows per bulk insert")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["user"]).first()
+        if not user:
+            raise CommandError(f"User {options['user']} not found")
+        if options["chunk_size"] < 1:
+            raise CommandError("Chunk size must be positive")
+        import_type = options["type"] or ("csv" if options["path"].endswith(".csv") else "ndjson")
+
+        # The author needs write access to the boards of the rows, as with the endpoint
+        writable = set(
+            BoardParticipant.objects.filter(user=user, role__in=WRITE_ROLES).values_list("board_id", flat=True)
+        )
+        importer = GoalImporter(user, options["chunk_size"], can_write=writable.__contains__)
+        progress = {"rows": 0, "created": 0, "failed": 0}
+        source = nullcontext(sys.stdin) if options["path"] == "-" else open(options["path"], encoding="utf-8", newline="")
+        with source as lines:
+            for progress in importer.run(iter_records(lines, import_type)):
+                for error in progress["errors"]:
+                    self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+                self.stdout.write(f"{progress['rows']} rows: {progress['created']} created, {progress['failed']} failed")
+        self.stdout.write(f"Done: {progress['created']} of {progress['rows']} rows imported")
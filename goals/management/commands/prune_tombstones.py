@@ -0,0 +1,9 @@
+from django.core.management import BaseCommand
+from goals.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "delete the tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{prune_tombstones()} tombstones deleted")
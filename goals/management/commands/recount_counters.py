@@ -0,0 +1,47 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from goals.models import GOAL_COUNT_FIELDS, Board, Goal, GoalCategory, GoalComment
+
+
+def count_of(queryset, outer_field: str):
+    """Number of rows of the queryset related to the outer row, 0 when there are none"""
+    return Coalesce(Subquery(
+        queryset.filter(**{outer_field: OuterRef("pk")}).order_by().values(outer_field).annotate(
+            count=Count("id")
+        ).values("count")
+    ), Value(0))
+
+
+class Command(BaseCommand):
+    help = "recompute the comment and goal counters of goals, categories and boards"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="rows per transaction")
+
+    def handle(self, *args, **options):
+        counters = (
+            (Goal, {"comment_count": count_of(GoalComment.objects.all(), "goal")}),
+            *(
+                (model, {field: count_of(Goal.objects.filter(status=status), outer_field)
+                         for status, field in GOAL_COUNT_FIELDS.items()})
+                for model, outer_field in ((GoalCategory, "category"), (Board, "board"))
+            ),
+        )
+        for model, values in counters:
+            fixed = self.recount(model, values, options["batch_size"])
+            self.stdout.write(f"{model._meta.verbose_name_plural}: {fixed} fixed")
+
+    @staticmethod
+    def recount(model, values: dict, batch_size: int) -> int:
+        """Updates the rows with wrong counters id range by id range, returns their number"""
+        wrong = Q()
+        for field, value in values.items():
+            wrong |= ~Q(**{field: value})
+        last_id = model.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        fixed = 0
+        for start in range(1, last_id + 1, batch_size):
+            with transaction.atomic():
+                fixed += model.objects.filter(wrong, id__gte=start, id__lt=start + batch_size).update(**values)
+        return fixed
@@ -0,0 +1,35 @@
+import logging
+import time
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import close_old_connections
+from goals.archive import run_pending_jobs
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "run the archiving of deleted boards and categories"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE, help="goals per transaction")
+        parser.add_argument("--once", action="store_true", help="exit when no job is left")
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            self.run_jobs(options["batch_size"])
+            return
+        while True:
+            # A lost database connection or any other error is retried with the next poll
+            try:
+                self.run_jobs(options["batch_size"])
+            except Exception:
+                logger.exception("Archive jobs failed")
+            finally:
+                close_old_connections()
+            time.sleep(settings.ARCHIVE_POLL_INTERVAL)
+
+    def run_jobs(self, batch_size: int):
+        count = run_pending_jobs(batch_size)
+        if count:
+            self.stdout.write(f"{count} archive jobs finished")
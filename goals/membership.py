@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from django.conf import settings
+from django.db import transaction
+from goals.models import Board, BoardParticipant
+
+WRITE_ROLES: tuple[int, ...] = (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
+
+
+class MembershipCache:
+    """
+    Process-wide TTL/LRU cache of board memberships.
+    Every entry holds all participants of one board as a {user_id: role} map,
+    so a missing user means that the user is not a participant of the board.
+    An entry is used only while the board keeps the version it was loaded at: every change
+    of the participants bumps the version in the database, so a removal or a downgrade made
+    by any process is seen at once
+    """
+    def __init__(self, ttl: float, max_boards: int):
+        self.ttl = ttl
+        self.max_boards = max_boards
+        self._boards: OrderedDict[int, tuple[float, int, dict[int, int]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_roles(self, board_id: int) -> tuple[Optional[int], dict[int, int]]:
+        """Version of the board and its {user_id: role} map"""
+        with self._lock:
+            entry = self._boards.get(board_id)
+        if entry and entry[0] <= time.monotonic():
+            entry = None
+
+        # One query: no rows while the board keeps the cached version, else the version and the participants
+        boards = Board.objects.filter(id=board_id)
+        if entry:
+            boards = boards.exclude(version=entry[1])
+        rows = list(boards.values_list("version", "participants__user_id", "participants__role"))
+        if entry and not rows:
+            with self._lock:
+                if board_id in self._boards:
+                    self._boards.move_to_end(board_id)
+            return entry[1], entry[2]
+        if not rows:
+            return None, {}
+
+        version = rows[0][0]
+        roles = {user_id: role for _, user_id, role in rows if user_id is not None}
+        with self._lock:
+            self._boards[board_id] = (time.monotonic() + self.ttl, version, roles)
+            self._boards.move_to_end(board_id)
+            while len(self._boards) > self.max_boards:
+                self._boards.popitem(last=False)
+        return version, roles
+
+    def invalidate(self, board_id: int):
+        with self._lock:
+            self._boards.pop(board_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._boards.clear()
+
+
+membership_cache = MembershipCache(
+    ttl=settings.MEMBERSHIP_CACHE_TTL, max_boards=settings.MEMBERSHIP_CACHE_MAX_BOARDS
+)
+
+
+def get_role(request, board_id: int) -> Optional[int]:
+    """Role of the request user on the board, None when the user is not a participant"""
+    request_cache = getattr(request, "_board_roles", None)
+    if request_cache is None:
+        request_cache = request._board_roles = {}
+    if board_id not in request_cache:
+        version, roles = membership_cache.get_roles(board_id)
+        request_cache[board_id] = (version, roles.get(request.user.id))
+    return request_cache[board_id][1]
+
+
+def get_checked_version(request, board_id: int) -> Optional[int]:
+    """Version of the board read by the permission check of the request"""
+    get_role(request, board_id)
+    return request._board_roles[board_id][0]
+
+
+def can_read(request, board_id: int) -> bool:
+    return get_role(request, board_id) is not None
+
+
+def can_write(request, board_id: int) -> bool:
+    return get_role(request, board_id) in WRITE_ROLES
+
+
+def invalidate_board(board_id: int, request=None):
+    """Drops cached memberships of the board now and once more after the transaction commits"""
+    membership_cache.invalidate(board_id)
+    if request is not None:
+        getattr(request, "_board_roles", {}).pop(board_id, None)
+    transaction.on_commit(lambda: membership_cache.invalidate(board_id))
@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_board(apps, schema_editor):
+    GoalCategory = apps.get_model("goals", "GoalCategory")
+    Goal = apps.get_model("goals", "Goal")
+    GoalComment = apps.get_model("goals", "GoalComment")
+
+    # One UPDATE per table copies the board from the category to the goal and from the goal to the comment
+    Goal.objects.update(
+        board_id=Subquery(GoalCategory.objects.filter(pk=OuterRef("category_id")).values("board_id")[:1])
+    )
+    GoalComment.objects.update(
+        board_id=Subquery(Goal.objects.filter(pk=OuterRef("goal_id")).values("board_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0008_goal_board_goalcomment_board'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_board, migrations.RunPython.noop)
+    ]
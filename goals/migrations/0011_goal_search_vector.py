@@ -0,0 +1,57 @@
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('simple', coalesce({table}title, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce({table}description, '')), 'B')
+"""
+
+CREATE_SQL = f"""
+CREATE FUNCTION goals_goal_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(table="NEW.")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER goals_goal_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON goals_goal
+    FOR EACH ROW EXECUTE FUNCTION goals_goal_search_vector_update();
+
+UPDATE goals_goal SET search_vector = {SEARCH_VECTOR_SQL.format(table="")};
+
+CREATE INDEX goals_goal_search_vector_gin ON goals_goal USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS goals_goal_search_vector_gin;
+DROP TRIGGER IF EXISTS goals_goal_search_vector_trigger ON goals_goal;
+DROP FUNCTION IF EXISTS goals_goal_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    # The trigger and the GIN index exist only on PostgreSQL, on SQLite the search falls back to ILIKE
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0010_alter_goal_board_alter_goalcomment_board'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='search_vector',
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.1 on 2026-10-18 20:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0013_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchiveJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Дата последнего обновления')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Ожидает'), (2, 'Выполняется'), (3, 'Выполнена'), (4, 'Ошибка')], default=1, verbose_name='Статус')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего целей')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Архивировано целей')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archive_jobs', to='goals.board', verbose_name='Доска')),
+                ('category', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='goals.goalcategory', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Архивация',
+                'verbose_name_plural': 'Архивации',
+                'indexes': [models.Index(condition=models.Q(('status__lt', 3)), fields=['status', 'id'], name='archive_job_unfinished_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.1 on 2026-10-18 20:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0014_archive_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='goalcomment',
+            name='goal',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='goals.goal', verbose_name='Цель'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcomment',
+            index=models.Index(fields=['goal', 'created'], name='comment_goal_created_idx'),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.1 on 2026-10-18 20:47
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+STATUSES = {1: "to_do_count", 2: "in_progress_count", 3: "done_count", 4: "archived_count"}
+
+
+def count_of(queryset, outer_field):
+    return Coalesce(Subquery(
+        queryset.filter(**{outer_field: OuterRef("pk")}).order_by().values(outer_field).annotate(
+            count=Count("id")
+        ).values("count")
+    ), Value(0))
+
+
+def fill_counters(apps, schema_editor):
+    Board = apps.get_model("goals", "Board")
+    GoalCategory = apps.get_model("goals", "GoalCategory")
+    Goal = apps.get_model("goals", "Goal")
+    GoalComment = apps.get_model("goals", "GoalComment")
+
+    # Одним UPDATE на таблицу считаем комментарии целей и цели категорий и досок по статусам
+    Goal.objects.update(comment_count=count_of(GoalComment.objects.all(), "goal"))
+    for model, outer_field in ((GoalCategory, "category"), (Board, "board")):
+        model.objects.update(**{
+            field: count_of(Goal.objects.filter(status=status), outer_field) for status, field in STATUSES.items()
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0015_comment_goal_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='archived_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Целей в архиве'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='done_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Выполненных целей'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='in_progress_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Целей в процессе'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='to_do_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Целей к выполнению'),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='comment_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='archived_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Целей в архиве'),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='done_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Выполненных целей'),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='in_progress_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Целей в процессе'),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='to_do_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Целей к выполнению'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
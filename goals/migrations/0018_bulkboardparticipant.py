@@ -0,0 +1,26 @@
+# Generated by Django 4.2.1 on 2026-10-18 22:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0017_board_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkBoardParticipant',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Участник',
+                'verbose_name_plural': 'Участники',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('goals.boardparticipant',),
+        ),
+    ]
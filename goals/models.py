@@ -1,6 +1,16 @@
-from typing import Tuple
+from collections import defaultdict
+from typing import Iterable, Optional, Tuple
 from core.models import User
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.utils import timezone
+from goals.versions import bump_boards
+
+
+class BoardScopedQuerySet(models.QuerySet):
+    def visible_to(self, user: User) -> models.QuerySet:
+        """Rows of the boards the user participates in, with a single lookup of BoardParticipant"""
+        return self.filter(board__in=BoardParticipant.objects.filter(user=user).values("board_id"))
 
 
 class BaseModel(models.Model):
@@ -11,13 +21,49 @@ class BaseModel(models.Model):
         abstract: bool = True
 
 
-class Board(BaseModel):
+class CountersModel(BaseModel):
+    """
+    Counter columns are changed with F() updates only,
+    saving a loaded row does not write them back
+    """
+    counter_fields: Tuple[str, ...] = ()
+
+    class Meta:
+        abstract: bool = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class GoalCountersModel(CountersModel):
+    """Number of goals by status, see change_goal_counts"""
+    counter_fields: Tuple[str, ...] = ("to_do_count", "in_progress_count", "done_count", "archived_count")
+
+    class Meta:
+        abstract: bool = True
+
+    to_do_count = models.IntegerField(verbose_name="Целей к выполнению", default=0, editable=False)
+    in_progress_count = models.IntegerField(verbose_name="Целей в процессе", default=0, editable=False)
+    done_count = models.IntegerField(verbose_name="Выполненных целей", default=0, editable=False)
+    archived_count = models.IntegerField(verbose_name="Целей в архиве", default=0, editable=False)
+
+
+class Board(GoalCountersModel):
     class Meta:
         verbose_name: str = "Доска"
         verbose_name_plural: str = "Доски"
 
+    counter_fields: Tuple[str, ...] = GoalCountersModel.counter_fields + ("version",)
+
     title = models.CharField(verbose_name="Название", max_length=255)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
+    # Raised by every write to the board, see goals.versions
+    version = models.PositiveBigIntegerField(verbose_name="Версия", default=0, editable=False)
 
 
 class BoardParticipant(BaseModel):
@@ -25,6 +71,10 @@ class BoardParticipant(BaseModel):
         unique_together: Tuple[str, ...] = ("board", "user")
         verbose_name: str = "Участник"
         verbose_name_plural: str = "Участники"
+        indexes: Tuple[models.Index, ...] = (
+            # Covers the board_id subquery of BoardScopedQuerySet.visible_to and the user foreign key
+            models.Index(fields=["user", "board"], name="participant_user_board_idx"),
+        )
 
     class Role(models.IntegerChoices):
         owner = 1, "Владелец"
@@ -42,19 +92,39 @@ class BoardParticipant(BaseModel):
         verbose_name="Пользователь",
         on_delete=models.PROTECT,
         related_name="participants",
+        db_index=False,
     )
     role = models.PositiveSmallIntegerField(
         verbose_name="Роль", choices=Role.choices, default=Role.owner
     )
 
 
-class GoalCategory(BaseModel):
+class BulkBoardParticipant(BoardParticipant):
+    """
+    Participants deleted in bulk. The delete receivers of BoardParticipant do not fire for
+    the proxy, so its queryset delete is one DELETE and the caller handles the removal once
+    """
+    class Meta:
+        proxy = True
+        verbose_name: str = "Участник"
+        verbose_name_plural: str = "Участники"
+
+
+class GoalCategory(GoalCountersModel):
     class Meta:
         verbose_name: str = "Категория"
         verbose_name_plural: str = "Категории"
+        # Deleted categories are never read by board, so the board foreign key is indexed only for the rest
+        indexes: Tuple[models.Index, ...] = (
+            models.Index(
+                fields=["board", "title", "id"], name="category_active_title_idx", condition=models.Q(is_deleted=False)
+            ),
+            # Delta sync: changed categories of a board, deleted ones included
+            models.Index(fields=["board", "updated"], name="category_board_updated_idx"),
+        )
 
     board = models.ForeignKey(
-        Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="categories"
+        Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="categories", db_index=False
     )
     title = models.CharField(verbose_name="Название", max_length=255)
     user = models.ForeignKey(
@@ -62,11 +132,25 @@ class GoalCategory(BaseModel):
     )
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
 
+    objects = BoardScopedQuerySet.as_manager()
+
 
-class Goal(BaseModel):
+class Goal(CountersModel):
     class Meta:
         verbose_name: str = 'Цель'
         verbose_name_plural: str = 'Цель'
+        # The board and category foreign keys are indexed by the composite indexes below,
+        # partial indexes skip archived goals (status 4, Status is declared below)
+        indexes: Tuple[models.Index, ...] = (
+            # Goal list: board visibility with status filters, archiving of board goals
+            models.Index(fields=["board", "status"], name="goal_board_status_idx"),
+            # Goal list: active goals of a board, due_date range filters and overdue goals
+            models.Index(fields=["board", "due_date"], name="goal_active_board_due_idx", condition=~models.Q(status=4)),
+            # Goal list: category and status filters, archiving of category goals
+            models.Index(fields=["category", "status"], name="goal_category_status_idx"),
+            # Delta sync: changed goals of a board, archived ones included
+            models.Index(fields=["board", "updated"], name="goal_board_updated_idx"),
+        )
 
     class Status(models.IntegerChoices):
         to_do = 1, "К выполнению"
@@ -86,6 +170,11 @@ class Goal(BaseModel):
         verbose_name="Категория",
         on_delete=models.PROTECT,
         related_name="goals",
+        db_index=False,
+    )
+    # Denormalized category.board, kept in sync on save
+    board = models.ForeignKey(
+        Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="goals", db_index=False
     )
     title = models.CharField(max_length=255, verbose_name="Название")
     description = models.TextField(verbose_name="Описание", null=True, blank=True)
@@ -95,13 +184,181 @@ class Goal(BaseModel):
     priority = models.PositiveSmallIntegerField(
         verbose_name="Приоритет", choices=Priority.choices, default=Priority.medium)
     due_date = models.DateField(verbose_name="Дата дедлайна", null=True, blank=True)
+    # Maintained by a database trigger on PostgreSQL, see migration 0011
+    search_vector = SearchVectorField(null=True, editable=False)
+    comment_count = models.IntegerField(verbose_name="Комментариев", default=0, editable=False)
+
+    objects = BoardScopedQuerySet.as_manager()
+    counter_fields: Tuple[str, ...] = ("comment_count",)
+
+    def get_counter_key(self) -> tuple[int, int, int]:
+        """(category, board, status) the goal is counted by"""
+        return self.category_id, self.board_id, self.status
+
+    def get_written_key(self, row_key: Optional[tuple], fields: Optional[Iterable[str]] = None) -> tuple[int, int, int]:
+        """
+        Key the goal is counted by after its fields, all of them by default, are written over a row
+        counted by row_key, None for a new row
+        """
+        if row_key is None or fields is None:
+            return self.get_counter_key()
+        fields = set(fields)
+        category_id, board_id = (self.category_id, self.board_id) if "category" in fields else row_key[:2]
+        return category_id, board_id, self.status if "status" in fields else row_key[2]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"category", "status"} & set(update_fields):
+            return super().save(*args, **kwargs)
+
+        old_board_id = self.board_id
+        moved = False
+        if update_fields is None or "category" in update_fields:
+            board_id = self.category.board_id
+            moved = self.pk is not None and old_board_id is not None and old_board_id != board_id
+            self.board_id = board_id
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "board"}
+        with transaction.atomic():
+            counted_as = None if self._state.adding else lock_counter_keys([self.pk]).get(self.pk)
+            super().save(*args, **kwargs)
+            change_goal_counts([(counted_as, self.get_written_key(counted_as, kwargs.get("update_fields")))])
+            if moved:
+                GoalComment.objects.filter(goal=self).update(board_id=board_id, updated=timezone.now())
+                Tombstone.objects.create(board_id=old_board_id, kind=Tombstone.Kind.goal, object_id=self.pk)
+                # post_save only knows the new board
+                bump_boards(old_board_id)
 
 
 class GoalComment(BaseModel):
     class Meta:
         verbose_name: str = "Комментарий к цели"
         verbose_name_plural: str = "Комментарии к целям"
+        # Also covers the board foreign key
+        indexes: Tuple[models.Index, ...] = (
+            # Delta sync: changed comments of a board
+            models.Index(fields=["board", "updated"], name="comment_board_updated_idx"),
+            # Comment pages of a goal, newest first, also covers the goal foreign key
+            models.Index(fields=["goal", "created"], name="comment_goal_created_idx"),
+        )
 
-    goal = models.ForeignKey(Goal, verbose_name="Цель", on_delete=models.PROTECT)
+    goal = models.ForeignKey(Goal, verbose_name="Цель", on_delete=models.PROTECT, db_index=False)
+    # Denormalized goal.board, kept in sync on save and on goal moves
+    board = models.ForeignKey(
+        Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="comments", db_index=False
+    )
     user = models.ForeignKey(User, verbose_name="Автор ", on_delete=models.PROTECT)
     text = models.TextField(verbose_name="Текст")
+
+    objects = BoardScopedQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        if self.board_id is None:
+            self.board_id = self.goal.board_id
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Removed comments are counted by signals.comment_deleted
+            Goal.objects.filter(pk=self.goal_id).update(comment_count=models.F("comment_count") + 1)
+
+
+GOAL_COUNT_FIELDS: dict[int, str] = {status: f"{status.name}_count" for status in Goal.Status}
+
+
+def lock_counter_keys(goal_ids: Iterable[int]) -> dict[int, tuple[int, int, int]]:
+    """
+    Counter keys the goals have now. Their rows stay locked until the transaction ends, so a concurrent
+    write of the same goals waits and then moves the counters from the key this one leaves
+    """
+    goal_ids = list(goal_ids)
+    if not goal_ids:
+        return {}
+    rows = Goal.objects.select_for_update().filter(id__in=goal_ids).order_by("id").values_list(
+        "id", "category_id", "board_id", "status"
+    )
+    return {goal_id: tuple(key) for goal_id, *key in rows}
+
+
+def change_goal_counts(moves: Iterable[tuple[Optional[tuple], Optional[tuple]]]):
+    """
+    Applies moves of goals between (category, board, status) keys to the goal counters of the categories
+    and the boards, None is the key of a created or a removed goal. Runs one update per changed row
+    """
+    changes = defaultdict(int)
+    for old, new in moves:
+        if old == new:
+            continue
+        if old is not None:
+            changes[old] -= 1
+        if new is not None:
+            changes[new] += 1
+
+    for model, position in ((GoalCategory, 0), (Board, 1)):
+        rows = defaultdict(dict)
+        for key, change in changes.items():
+            if change:
+                counts = rows[key[position]]
+                counts[key[2]] = counts.get(key[2], 0) + change
+        for row_id, counts in rows.items():
+            values = {
+                GOAL_COUNT_FIELDS[status]: models.F(GOAL_COUNT_FIELDS[status]) + change
+                for status, change in counts.items() if change
+            }
+            if values:
+                model.objects.filter(pk=row_id).update(**values)
+
+
+class Tombstone(models.Model):
+    """
+    Removal of an object from a board that leaves no row behind: a deleted comment,
+    a goal moved to another board or a participant removed from the board.
+    Soft deletes are tracked by the rows themselves
+    """
+    class Meta:
+        verbose_name: str = "Удаленный объект"
+        verbose_name_plural: str = "Удаленные объекты"
+        indexes: Tuple[models.Index, ...] = (
+            models.Index(fields=["board", "created"], name="tombstone_board_created_idx"),
+        )
+
+    class Kind(models.IntegerChoices):
+        board = 1, "Доска"
+        goal = 2, "Цель"
+        comment = 3, "Комментарий"
+
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.CASCADE, db_index=False)
+    # Set for a board removed from a single participant
+    user = models.ForeignKey(User, verbose_name="Пользователь", on_delete=models.CASCADE, null=True, blank=True)
+    kind = models.PositiveSmallIntegerField(verbose_name="Тип", choices=Kind.choices)
+    object_id = models.BigIntegerField(verbose_name="Идентификатор")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Дата удаления")
+
+
+class ArchiveJob(BaseModel):
+    """Archiving of the categories and goals of a deleted board or of the goals of a deleted category"""
+    class Meta:
+        verbose_name: str = "Архивация"
+        verbose_name_plural: str = "Архивации"
+        indexes: Tuple[models.Index, ...] = (
+            # Unfinished jobs polled by the worker
+            models.Index(fields=["status", "id"], name="archive_job_unfinished_idx", condition=models.Q(status__lt=3)),
+        )
+
+    class Status(models.IntegerChoices):
+        pending = 1, "Ожидает"
+        running = 2, "Выполняется"
+        done = 3, "Выполнена"
+        failed = 4, "Ошибка"
+
+    board = models.ForeignKey(Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="archive_jobs")
+    # Empty for the archiving of the whole board
+    category = models.ForeignKey(
+        GoalCategory, verbose_name="Категория", on_delete=models.PROTECT, null=True, blank=True, db_index=False
+    )
+    status = models.PositiveSmallIntegerField(verbose_name="Статус", choices=Status.choices, default=Status.pending)
+    total = models.PositiveIntegerField(verbose_name="Всего целей", default=0)
+    processed = models.PositiveIntegerField(verbose_name="Архивировано целей", default=0)
+    error = models.TextField(verbose_name="Ошибка", blank=True)
+
+    objects = BoardScopedQuerySet.as_manager()
@@ -0,0 +1,189 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import Any, Optional
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Model, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def parse_positive_int(value: str, cutoff: Optional[int] = None) -> int:
+    """Positive integer of a query parameter, at most cutoff, ValueError for anything else"""
+    number = int(value)
+    if number <= 0:
+        raise ValueError(f"{value} is not positive")
+    return min(number, cutoff) if cutoff else number
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the ordering of the queryset.
+    The primary key is appended as a tiebreaker, so every page is fetched
+    with a single indexed range condition instead of OFFSET and COUNT(*)
+    """
+    cursor_query_param: str = "cursor"
+    page_size_query_param: str = "limit"
+    page_size: int = 100
+    max_page_size: int = 1000
+    invalid_cursor_message: str = "Invalid cursor"
+    # Fixed ordering, when empty the ordering of the queryset is used
+    ordering: tuple[str, ...] = ()
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> Optional[list]:
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        queryset = queryset.order_by(*self.get_order_by(queryset.model))
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(queryset.model, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request: Request) -> int:
+        try:
+            return parse_positive_int(request.query_params[self.page_size_query_param], cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, queryset: QuerySet) -> tuple[str, ...]:
+        ordering = [
+            field for field in (self.ordering or queryset.query.order_by or queryset.model._meta.ordering)
+            if isinstance(field, str) and field != "?"
+        ]
+        if not ordering or ordering[-1].lstrip("-") not in ("id", "pk"):
+            ordering.append("id")
+        return tuple("-id" if field == "-pk" else "id" if field == "pk" else field for field in ordering)
+
+    def get_order_by(self, model: type[Model]) -> list:
+        order_by = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            if not self.is_nullable(model, name):
+                order_by.append(field)
+            elif field.startswith("-"):
+                order_by.append(F(name).desc(nulls_first=True))
+            else:
+                order_by.append(F(name).asc(nulls_last=True))
+        return order_by
+
+    def get_position_filter(self, model: type[Model], position: list) -> Q:
+        """Builds `(a > x) OR (a = x AND b > y) OR ...` for the ordering"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            descending = field.startswith("-")
+            nullable = self.is_nullable(model, name)
+            if value is None:
+                # NULLs go last on ascending and first on descending ordering
+                after = Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                after = Q(**{f"{name}__lt" if descending else f"{name}__gt": value})
+                if nullable and not descending:
+                    after |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= equal & after
+            equal &= same
+
+        # The OR of the conditions is not an index condition, the redundant range of the first
+        # field is, so a deep page starts at the position instead of filtering the rows before it
+        field, value = self.ordering[0], position[0]
+        name = field.lstrip("-")
+        if value is not None and not self.is_nullable(model, name):
+            condition &= Q(**{f"{name}__lte" if field.startswith("-") else f"{name}__gte": value})
+        return condition
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        position = [self.get_position_value(self.page[-1], field) for field in self.ordering]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    def encode_cursor(self, position: list) -> str:
+        data = json.dumps({"o": self.ordering, "p": position}, default=self._encode_value, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request: Request) -> Optional[list]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            ordering, position = tuple(data["o"]), data["p"]
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if ordering != self.ordering or not isinstance(position, list) or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    @staticmethod
+    def get_position_value(obj: Any, field: str) -> Any:
+        for attr in field.lstrip("-").split("__"):
+            obj = getattr(obj, attr, None)
+            if isinstance(obj, Model):
+                obj = obj.pk
+        return obj
+
+    @staticmethod
+    def is_nullable(model: type[Model], name: str) -> bool:
+        if "__" in name:
+            return True
+        try:
+            return model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return True
+
+    @staticmethod
+    def _encode_value(value: Any) -> str:
+        if isinstance(value, (datetime.date, datetime.datetime, datetime.time)):
+            return value.isoformat()
+        return str(value)
+
+
+class GoalPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination for the goal list, switched to keyset pagination
+    when the `cursor` parameter is passed (an empty value requests the first page)
+    """
+    keyset_class: type[KeysetPagination] = KeysetPagination
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> Optional[list]:
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CommentPagination(KeysetPagination):
+    """Newest comments first, pages of a goal are read from the (goal, created) index"""
+    ordering: tuple[str, ...] = ("-created", "-id")
@@ -1,6 +1,7 @@
 from rest_framework.generics import GenericAPIView
-from rest_framework.permissions import IsAuthenticated, BasePermission, SAFE_METHODS
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.request import Request
+from goals.membership import can_read, can_write, get_role
 from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
 
 
@@ -9,15 +10,12 @@ class GoalCategoryPermission(IsAuthenticated):
     Permission class for Category model,
     determines if a user has permission to access a category
     """
-    def has_object_permission(self, request, view, obj):
+    def has_object_permission(self, request: Request, view: GenericAPIView, obj: GoalCategory):
         if not request.user.is_authenticated:
             return False
         if request.method in SAFE_METHODS:
-            return BoardParticipant.objects.filter(user=request.user, board=obj.board).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user, board=obj.board,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists()
+            return can_read(request, obj.board_id)
+        return can_write(request, obj.board_id)
 
 
 class GoalPermission(IsAuthenticated):
@@ -25,15 +23,12 @@ class GoalPermission(IsAuthenticated):
     Permission class for Goal model,
     determines if a user has permission to access a goal
     """
-    def has_object_permission(self, request, view, obj):
+    def has_object_permission(self, request: Request, view: GenericAPIView, obj: Goal):
         if not request.user.is_authenticated:
             return False
         if request.method in SAFE_METHODS:
-            return BoardParticipant.objects.filter(user=request.user, board=obj.category.board).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user, board=obj.category.board,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists()
+            return can_read(request, obj.board_id)
+        return can_write(request, obj.board_id)
 
 
 class CommentPermission(IsAuthenticated):
@@ -43,17 +38,8 @@ class CommentPermission(IsAuthenticated):
     """
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: GoalComment):
         if request.method in SAFE_METHODS:
-            return BoardParticipant.objects.filter(
-                user=request.user, board=obj.goal.category.board
-            ).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user,
-            board=obj.goal.category.board,
-            role__in=[
-                BoardParticipant.Role.owner,
-                BoardParticipant.Role.writer,
-            ],
-        ).exists()
+            return can_read(request, obj.board_id)
+        return can_write(request, obj.board_id)
 
 
 class BoardPermission(IsAuthenticated):
@@ -61,11 +47,23 @@ class BoardPermission(IsAuthenticated):
     Permission class for Board model,
     determines if a user has permission to access a board
     """
-    def has_object_permission(self, request, view, obj):
+    def has_object_permission(self, request: Request, view: GenericAPIView, obj: Board):
         if request.method in SAFE_METHODS:
-            return BoardParticipant.objects.filter(
-                user=request.user, board=obj
-            ).exists()
-        return BoardParticipant.objects.filter(
-            user=request.user, board=obj, role=BoardParticipant.Role.owner
-        ).exists()
+            return can_read(request, obj.id)
+        return get_role(request, obj.id) == BoardParticipant.Role.owner
+
+
+class BoardParticipantPermission(IsAuthenticated):
+    """
+    Permission class for participants of the board in the URL,
+    only the owner changes them, the owners are not changed one by one
+    """
+    def has_permission(self, request: Request, view: GenericAPIView) -> bool:
+        if not super().has_permission(request, view):
+            return False
+        if request.method in SAFE_METHODS:
+            return can_read(request, view.kwargs["board_pk"])
+        return get_role(request, view.kwargs["board_pk"]) == BoardParticipant.Role.owner
+
+    def has_object_permission(self, request: Request, view: GenericAPIView, obj: BoardParticipant) -> bool:
+        return request.method in SAFE_METHODS or obj.role != BoardParticipant.Role.owner
@@ -1,10 +1,17 @@
-from typing import Tuple
+from typing import Optional, Tuple
 from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery, prefetch_related_objects
+from django.utils import timezone
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.relations import SlugRelatedField
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.membership import can_write, invalidate_board
+from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant, Tombstone, ArchiveJob, \
+    change_goal_counts, lock_counter_keys
+from goals.versions import bump_boards
+from goals.signals import delete_participants
 from rest_framework.serializers import ModelSerializer, CurrentUserDefault, HiddenField, PrimaryKeyRelatedField,\
-    ChoiceField
+    BooleanField, CharField, ChoiceField, DateField, DictField, IntegerField, ListField, Serializer, \
+    SerializerMethodField
 from core.serializers import ProfileSerializer
 from core.models import User
 
@@ -21,11 +28,7 @@ class GoalCategoryCreateSerializer(ModelSerializer):
     def validate_board(self, value: Board) -> Board:
         if value.is_deleted:
             raise ValidationError("Board removed")
-        if not BoardParticipant.objects.filter(
-            board_id=value.id,
-            user_id=self.context["request"].user.id,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists():
+        if not can_write(self.context["request"], value.id):
             raise PermissionDenied
 
         return value
@@ -48,18 +51,14 @@ class GoalCreateSerializer(ModelSerializer):
 
     class Meta:
         model = Goal
-        fields = "__all__"
+        exclude: Tuple [str, ...] = ("board", "search_vector")
         read_only_fields: Tuple [str, ...] = ("id", "created", "updated", "user")
 
     def validate_category(self, value: GoalCategory) -> GoalCategory:
         if value.is_deleted:
             raise ValidationError('Category not found')
 
-        if not BoardParticipant.objects.filter(
-            board_id=value.board.id,
-            user_id=self.context['request'].user.id,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-        ).exists():
+        if not can_write(self.context['request'], value.board_id):
             raise PermissionDenied
 
         return value
@@ -72,7 +71,7 @@ class GoalSerializer(ModelSerializer):
 
     class Meta:
         model = Goal
-        fields = "__all__"
+        exclude: Tuple [str, ...] = ("board", "search_vector")
         read_only_fields: Tuple [str, ...] = ("id", "created", "updated", "user")
 
     def validate_category(self, value: GoalCategory) -> GoalCategory:
@@ -83,6 +82,147 @@ class GoalSerializer(ModelSerializer):
         return value
 
 
+class GoalBatchItemSerializer(ModelSerializer):
+    """Serializer for one operation of a goal batch"""
+    op = ChoiceField(choices=("create", "update", "archive"))
+    id = IntegerField(required=False)
+    category = IntegerField(required=False)
+
+    class Meta:
+        model = Goal
+        fields: Tuple [str, ...] = ("op", "id", "category", "title", "description", "status", "priority", "due_date")
+        extra_kwargs: dict = {"title": {"required": False}}
+
+    def validate(self, attrs: dict) -> dict:
+        required = ("category", "title") if attrs["op"] == "create" else ("id",)
+        missing = {field: "This field is required." for field in required if field not in attrs}
+        if missing:
+            raise ValidationError(missing)
+        if attrs["op"] == "archive" and "category" in attrs:
+            raise ValidationError({"category": "An archived goal keeps its category."})
+        return attrs
+
+
+class GoalImportRowSerializer(ModelSerializer):
+    """Serializer for one row of a goal import, `user` is the username of the author"""
+    category = IntegerField()
+    user = CharField(required=False)
+
+    class Meta:
+        model = Goal
+        fields: Tuple [str, ...] = ("category", "user", "title", "description", "status", "priority", "due_date")
+
+
+class GoalBatchSerializer(Serializer):
+    """
+    Serializer for a batch of goal create/update/archive operations.
+    Goals, categories and roles are looked up once for the whole batch,
+    valid operations are written with bulk queries in one transaction
+    and every operation gets its own result
+    """
+    operations = ListField(child=DictField(), allow_empty=False, max_length=1000)
+
+    def create(self, validated_data: dict) -> list[dict]:
+        request = self.context["request"]
+        results: list = [None] * len(validated_data["operations"])
+        items = {}
+        for index, data in enumerate(validated_data["operations"]):
+            item = GoalBatchItemSerializer(data=data)
+            if item.is_valid():
+                items[index] = item.validated_data
+            else:
+                results[index] = {"index": index, "op": data.get("op"), "ok": False, "errors": item.errors}
+
+        goals = Goal.objects.visible_to(request.user).in_bulk(
+            [attrs["id"] for attrs in items.values() if attrs["op"] != "create"]
+        )
+        categories = GoalCategory.objects.visible_to(request.user).filter(is_deleted=False).in_bulk(
+            [attrs["category"] for attrs in items.values() if "category" in attrs]
+        )
+
+        created, updated, moved, boards = {}, {}, {}, set()
+        update_fields = {"updated"}
+        for index, attrs in items.items():
+            op = attrs.pop("op")
+            goal = goals.get(attrs.pop("id", None))
+            category_id = attrs.pop("category", None)
+            category = categories.get(category_id)
+            errors = self.check_operation(request, op, goal, category_id, category)
+            if errors:
+                results[index] = {"index": index, "op": op, "ok": False, "errors": errors}
+                continue
+
+            if op == "create":
+                created[index] = Goal(user=request.user, category=category, board_id=category.board_id, **attrs)
+                boards.add(category.board_id)
+                continue
+            if op == "archive":
+                attrs = {"status": Goal.Status.archived}
+            boards.add(goal.board_id)
+            if category and category.id != goal.category_id:
+                goal.category = category
+                if goal.board_id != category.board_id:
+                    moved.setdefault(goal.id, goal.board_id)
+                    goal.board_id = category.board_id
+                    boards.add(goal.board_id)
+                update_fields |= {"category", "board"}
+            for field, value in attrs.items():
+                setattr(goal, field, value)
+            update_fields |= set(attrs)
+            updated[goal.id] = goal
+            results[index] = {"index": index, "op": op, "id": goal.id, "ok": True}
+
+        now = timezone.now()
+        with transaction.atomic():
+            Goal.objects.bulk_create(created.values())
+            # Read again with a lock, the goals loaded above may have been changed since
+            counted_as = lock_counter_keys(updated)
+            if updated:
+                for goal in updated.values():
+                    goal.updated = now
+                Goal.objects.bulk_update(updated.values(), fields=sorted(update_fields))
+            change_goal_counts(
+                [(None, goal.get_counter_key()) for goal in created.values()]
+                + [(counted_as[goal_id], goal.get_written_key(counted_as[goal_id], update_fields))
+                   for goal_id, goal in updated.items() if goal_id in counted_as]
+            )
+            if moved:
+                GoalComment.objects.filter(goal_id__in=list(moved)).update(
+                    board_id=Subquery(Goal.objects.filter(pk=OuterRef("goal_id")).values("board_id")[:1]),
+                    updated=now,
+                )
+                Tombstone.objects.bulk_create([
+                    Tombstone(board_id=board_id, kind=Tombstone.Kind.goal, object_id=goal_id)
+                    for goal_id, board_id in moved.items()
+                ])
+            # Bulk queries do not send model signals
+            bump_boards(*boards)
+
+        for index, goal in created.items():
+            results[index] = {"index": index, "op": "create", "id": goal.id, "ok": True}
+        return results
+
+    @staticmethod
+    def check_operation(
+        request, op: str, goal: Optional[Goal], category_id: Optional[int], category: Optional[GoalCategory]
+    ) -> Optional[dict]:
+        if op != "create":
+            if not goal:
+                return {"id": ["Goal not found"]}
+            if not can_write(request, goal.board_id):
+                return {"id": [PermissionDenied.default_detail]}
+        if category_id is None:
+            return None
+        if not category:
+            return {"category": ["Category not found"]}
+        if not can_write(request, category.board_id):
+            return {"category": [PermissionDenied.default_detail]}
+        # Same rule as GoalSerializer.validate_category for moving a goal
+        if op == "update" and category.id != goal.category_id and category.user_id != request.user.id:
+            return {"category": [PermissionDenied.default_detail]}
+        return None
+
+
 class GoalCommentCreateSerializer(ModelSerializer):
     """Serializer for creating a new comment"""
     user = HiddenField(default=CurrentUserDefault())
@@ -97,7 +237,7 @@ class GoalCommentCreateSerializer(ModelSerializer):
     class Meta:
         model = GoalComment
         read_only_fields: Tuple [str, ...] = ('id', 'user', 'created', 'updated')
-        fields = '__all__'
+        exclude: Tuple [str, ...] = ('board',)
 
 
 class GoalCommentSerializer(ModelSerializer):
@@ -108,7 +248,7 @@ class GoalCommentSerializer(ModelSerializer):
     class Meta:
         model = GoalComment
         read_only_fields: Tuple [str, ...] = ('id', 'goal', 'user', 'created', 'updated')
-        fields = '__all__'
+        exclude: Tuple [str, ...] = ('board',)
 
 
 class BoardCreateSerializer(ModelSerializer):
@@ -118,7 +258,7 @@ class BoardCreateSerializer(ModelSerializer):
     class Meta:
         model = Board
         read_only_fields: Tuple [str, ...] = ("id", "created", "updated")
-        fields = "__all__"
+        exclude: Tuple [str, ...] = ("version",)
 
     def create(self, validated_data: dict) -> Board:
         user = validated_data.pop("user")
@@ -129,12 +269,25 @@ class BoardCreateSerializer(ModelSerializer):
         return board
 
 
+class ParticipantUserField(SlugRelatedField):
+    """Username field resolved from the users the parent serializer looked up with one query"""
+    def to_internal_value(self, data: str) -> User:
+        users = self.context.get("participant_users")
+        if users is None:
+            return super().to_internal_value(data)
+        if not isinstance(data, str):
+            self.fail("invalid")
+        if data not in users:
+            self.fail("does_not_exist", slug_name=self.slug_field, value=data)
+        return users[data]
+
+
 class BoardParticipantSerializer(ModelSerializer):
     """Serializer for participants"""
     role = ChoiceField(
         required=True, choices=BoardParticipant.Role.choices[1:]
     )
-    user = SlugRelatedField(
+    user = ParticipantUserField(
         slug_field="username", queryset=User.objects.all()
     )
 
@@ -144,6 +297,19 @@ class BoardParticipantSerializer(ModelSerializer):
         read_only_fields: Tuple [str, ...] = ("id", "created", "updated", "board")
 
 
+class BoardParticipantCreateSerializer(BoardParticipantSerializer):
+    """Serializer for adding one participant to the board of the URL"""
+    def validate_user(self, value: User) -> User:
+        if BoardParticipant.objects.filter(board_id=self.context["view"].kwargs["board_pk"], user=value).exists():
+            raise ValidationError("User is already a participant")
+        return value
+
+
+class BoardParticipantUpdateSerializer(BoardParticipantSerializer):
+    """Serializer for changing the role of one participant"""
+    user = SlugRelatedField(slug_field="username", read_only=True)
+
+
 class BoardSerializer(ModelSerializer):
     """Serializer for retrieving/updating/deleting board"""
     participants = BoardParticipantSerializer(many=True)
@@ -151,37 +317,60 @@ class BoardSerializer(ModelSerializer):
 
     class Meta:
         model = Board
-        fields = "__all__"
+        exclude: Tuple [str, ...] = ("version",)
         read_only_fields: Tuple [str, ...] = ("id", "created", "updated")
 
+    def to_representation(self, instance: Board) -> dict:
+        # The prefetched participants are dropped after an update
+        if "participants" not in getattr(instance, "_prefetched_objects_cache", {}):
+            prefetch_related_objects(
+                [instance], Prefetch("participants", queryset=BoardParticipant.objects.select_related("user"))
+            )
+        return super().to_representation(instance)
+
+    def to_internal_value(self, data) -> dict:
+        participants = data.get("participants") if hasattr(data, "get") else None
+        if isinstance(participants, list):
+            usernames = {part.get("user") for part in participants if isinstance(part, dict)}
+            usernames = {username for username in usernames if isinstance(username, str)}
+            self.context["participant_users"] = User.objects.in_bulk(usernames, field_name="username")
+        return super().to_internal_value(data)
+
     def update(self, instance: Board, validated_data: dict) -> Board:
+        """Applies the difference between the current and the new participants with bulk queries"""
         owner = validated_data.pop("user")
-        new_participants = validated_data.pop("participants")
-        new_by_id = {part["user"].id: part for part in new_participants}
+        new_by_id = {part["user"].id: part for part in validated_data.pop("participants")}
+        new_by_id.pop(owner.id, None)
 
-        old_participants = instance.participants.exclude(user=owner)
+        now = timezone.now()
+        removed, changed = [], []
         with transaction.atomic():
-            for old_participant in old_participants:
-                if old_participant.user_id not in new_by_id:
-                    old_participant.delete()
-                else:
-                    if (
-                            old_participant.role
-                            != new_by_id[old_participant.user_id]["role"]
-                    ):
-                        old_participant.role = new_by_id[old_participant.user_id][
-                            "role"
-                        ]
-                        old_participant.save()
-                    new_by_id.pop(old_participant.user_id)
-            for new_part in new_by_id.values():
-                BoardParticipant.objects.create(
-                    board=instance, user=new_part["user"], role=new_part["role"]
-                )
-
+            # The participants prefetched by the view are reused
+            for old_participant in instance.participants.all():
+                new_part = new_by_id.pop(old_participant.user_id, None)
+                if old_participant.user_id == owner.id:
+                    continue
+                if new_part is None:
+                    removed.append(old_participant)
+                elif old_participant.role != new_part["role"]:
+                    old_participant.role = new_part["role"]
+                    old_participant.updated = now
+                    changed.append(old_participant)
+
+            if removed:
+                # Saving the board below bumps its version
+                delete_participants(instance.id, removed, bump=False)
+            BoardParticipant.objects.bulk_update(changed, fields=("role", "updated"))
+            BoardParticipant.objects.bulk_create([
+                BoardParticipant(board=instance, user=new_part["user"], role=new_part["role"])
+                for new_part in new_by_id.values()
+            ])
+
+            # Saving the board bumps its version
             instance.title = validated_data["title"]
             instance.save()
 
+        invalidate_board(instance.id, request=self.context["request"])
         return instance
 
 
@@ -189,4 +378,51 @@ class BoardListSerializer(ModelSerializer):
     """Serializer for a list of boards"""
     class Meta:
         model = Board
+        exclude: Tuple [str, ...] = ("version",)
+
+
+class BoardSnapshotSerializer(ModelSerializer):
+    """Serializer for a board with its categories and goals grouped by status"""
+    participants = BoardParticipantSerializer(many=True, read_only=True)
+    categories = GoalCategorySerializer(many=True, read_only=True, source="active_categories")
+    goals = SerializerMethodField()
+
+    class Meta:
+        model = Board
+        fields: Tuple [str, ...] = ("id", "title", "created", "updated", "is_deleted", "participants", "categories",
+                                    "goals")
+
+    def get_goals(self, instance: Board) -> dict:
+        goals = {status.name: [] for status in Goal.Status if status != Goal.Status.archived}
+        for goal, data in zip(instance.active_goals, GoalSerializer(instance.active_goals, many=True).data):
+            goals[Goal.Status(goal.status).name].append(data)
+        return goals
+
+
+class ArchiveJobSerializer(ModelSerializer):
+    """Serializer for the status and the progress of an archive job"""
+    class Meta:
+        model = ArchiveJob
         fields = "__all__"
+
+
+class SyncSerializer(Serializer):
+    """Serializer for a page of the objects changed since the previous delta sync"""
+    cursor = CharField()
+    has_more = BooleanField()
+    boards = BoardListSerializer(many=True)
+    categories = GoalCategorySerializer(many=True)
+    goals = GoalSerializer(many=True)
+    comments = GoalCommentSerializer(many=True)
+    deleted = DictField(child=ListField(child=IntegerField()))
+
+
+class BoardStatsSerializer(Serializer):
+    """Serializer for the goal statistics of a board"""
+    board = IntegerField()
+    date = DateField()
+    total = IntegerField()
+    overdue = IntegerField()
+    by_status = DictField(child=IntegerField())
+    by_priority = DictField(child=IntegerField())
+    workload = ListField(child=DictField())
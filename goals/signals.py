@@ -0,0 +1,89 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from core.models import User
+from core.serializers import ProfileSerializer
+from goals.membership import invalidate_board
+from goals.models import Board, BoardParticipant, BulkBoardParticipant, Goal, GoalCategory, GoalComment, Tombstone, \
+    change_goal_counts, lock_counter_keys
+from goals.versions import bump_boards
+
+
+def participants_removed(board_id: int, user_ids: list[int], bump: bool = True):
+    """
+    Tombstones that tell the delta sync of the removed users to drop the board, dropped cached
+    memberships and a new board version unless the caller bumps it anyway
+    """
+    Tombstone.objects.bulk_create([
+        Tombstone(board_id=board_id, user_id=user_id, kind=Tombstone.Kind.board, object_id=board_id)
+        for user_id in user_ids
+    ])
+    invalidate_board(board_id)
+    if bump:
+        bump_boards(board_id)
+
+
+def delete_participants(board_id: int, participants: list[BoardParticipant], bump: bool = True):
+    """Deletes participants of the board with a constant number of queries whatever their number"""
+    BulkBoardParticipant.objects.filter(id__in=[participant.id for participant in participants]).delete()
+    participants_removed(board_id, [participant.user_id for participant in participants], bump=bump)
+
+
+@receiver(post_save, sender=BoardParticipant)
+def participant_changed(sender, instance: BoardParticipant, **kwargs):
+    """Drops cached memberships of the board when its participants change"""
+    invalidate_board(instance.board_id)
+    bump_boards(instance.board_id)
+
+
+@receiver([post_save, post_delete], sender=GoalCategory)
+@receiver([post_save, post_delete], sender=Goal)
+@receiver([post_save, post_delete], sender=GoalComment)
+def board_content_changed(sender, instance, **kwargs):
+    """Makes cached responses of the board stale when its content changes"""
+    bump_boards(instance.board_id)
+
+
+@receiver([post_save, post_delete], sender=Board)
+def board_changed(sender, instance: Board, **kwargs):
+    bump_boards(instance.id)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance: User, created: bool, update_fields=None, **kwargs):
+    """Responses of the user's boards embed the user's profile"""
+    if created or (update_fields is not None and not set(update_fields) & set(ProfileSerializer.Meta.fields)):
+        return
+    bump_boards(*BoardParticipant.objects.filter(user=instance).values_list("board_id", flat=True))
+
+
+@receiver(post_delete, sender=BoardParticipant)
+def participant_removed(sender, instance: BoardParticipant, **kwargs):
+    """Tells the delta sync of the removed user to drop the board"""
+    participants_removed(instance.board_id, [instance.user_id])
+
+
+@receiver(pre_delete, sender=GoalComment)
+def comment_deleting(sender, instance: GoalComment, **kwargs):
+    # Sent in the transaction of the delete, the lock makes a concurrent delete of the comment find it gone
+    instance.counted = GoalComment.objects.select_for_update().filter(pk=instance.pk).values_list(
+        "id", flat=True
+    ).first() is not None
+
+
+@receiver(post_delete, sender=GoalComment)
+def comment_deleted(sender, instance: GoalComment, **kwargs):
+    if getattr(instance, "counted", False):
+        Goal.objects.filter(pk=instance.goal_id).update(comment_count=F("comment_count") - 1)
+        Tombstone.objects.create(board_id=instance.board_id, kind=Tombstone.Kind.comment, object_id=instance.id)
+
+
+@receiver(pre_delete, sender=Goal)
+def goal_deleting(sender, instance: Goal, **kwargs):
+    instance.counted_as = lock_counter_keys([instance.pk]).get(instance.pk)
+
+
+@receiver(post_delete, sender=Goal)
+def goal_deleted(sender, instance: Goal, **kwargs):
+    if getattr(instance, "counted_as", None) is not None:
+        change_goal_counts([(instance.counted_as, None)])
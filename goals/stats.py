@@ -0,0 +1,55 @@
+import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+from goals.models import Board, Goal
+
+STATS_KEY: str = "goals:stats:{}:{}:{}"
+OPEN_STATUSES: tuple[int, ...] = (Goal.Status.to_do, Goal.Status.in_progress)
+
+
+def get_board_stats(board_id: int, today: datetime.date) -> dict:
+    """
+    Goals of the board by status and by priority, overdue goals and the workload of every author,
+    rolled up from one query grouped by status, priority and author
+    """
+    groups = Goal.objects.filter(board_id=board_id).order_by().values("status", "priority", "user__username").annotate(
+        count=Count("id"), overdue=Count("id", filter=Q(due_date__lt=today, status__in=OPEN_STATUSES))
+    )
+
+    by_status = {status.name: 0 for status in Goal.Status}
+    # Archived goals are not counted by priority and workload
+    by_priority = {priority.name: 0 for priority in Goal.Priority}
+    workload = {}
+    for group in groups:
+        by_status[Goal.Status(group["status"]).name] += group["count"]
+        if group["status"] == Goal.Status.archived:
+            continue
+        by_priority[Goal.Priority(group["priority"]).name] += group["count"]
+        user = workload.setdefault(
+            group["user__username"], {"user": group["user__username"], "open": 0, "done": 0, "overdue": 0}
+        )
+        user["open" if group["status"] in OPEN_STATUSES else "done"] += group["count"]
+        user["overdue"] += group["overdue"]
+
+    return {
+        "board": board_id,
+        "date": today,
+        "total": sum(by_status.values()),
+        "overdue": sum(user["overdue"] for user in workload.values()),
+        "by_status": by_status,
+        "by_priority": by_priority,
+        "workload": sorted(workload.values(), key=lambda user: (-user["open"], user["user"])),
+    }
+
+
+def get_cached_board_stats(board: Board) -> dict:
+    """Stats of the board cached under its version, and under the date for the overdue goals"""
+    today = timezone.localdate()
+    key = STATS_KEY.format(board.id, board.version, today.isoformat())
+    stats = cache.get(key)
+    if stats is None:
+        stats = get_board_stats(board.id, today)
+        cache.set(key, stats, settings.RESPONSE_CACHE_TIMEOUT)
+    return stats
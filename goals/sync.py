@@ -0,0 +1,170 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import NamedTuple, Optional
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from core.models import User
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment, Tombstone
+
+INVALID_CURSOR_MESSAGE: str = "Invalid cursor"
+# Objects of a sync response in the order they are paged through
+STREAMS: tuple[str, ...] = ("boards", "categories", "goals", "comments", "tombstones")
+
+
+class SyncPosition(NamedTuple):
+    # Time of the previous sync, None for the first sync
+    since: Optional[datetime.datetime]
+    # Time the sync started, the `since` of the next sync
+    snapshot: datetime.datetime
+    # Index in STREAMS and the last id sent of that stream
+    stream: int = 0
+    after: int = 0
+
+
+class ResyncRequired(APIException):
+    """The tombstones since the cursor are pruned, the client has to start over without a cursor"""
+    status_code = status.HTTP_410_GONE
+    default_detail = "Full resync required"
+    default_code = "resync_required"
+
+
+def encode_cursor(position: SyncPosition, has_more: bool) -> str:
+    """Cursor of the next page, or of the next sync after the last page"""
+    if has_more:
+        data = {"s": position.since and position.since.isoformat(), "n": position.snapshot.isoformat(),
+                "k": position.stream, "a": position.after}
+    else:
+        data = {"t": position.snapshot.isoformat()}
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+def parse_time(value) -> datetime.datetime:
+    since = parse_datetime(value)
+    if since is None or timezone.is_naive(since):
+        raise ValueError(value)
+    return since
+
+
+def decode_cursor(encoded: Optional[str]) -> SyncPosition:
+    """Position of the sync, the first page of a new sync without a cursor"""
+    if not encoded:
+        return SyncPosition(since=None, snapshot=timezone.now())
+    try:
+        data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        if "t" in data:
+            return SyncPosition(since=parse_time(data["t"]), snapshot=timezone.now())
+        position = SyncPosition(
+            since=data["s"] and parse_time(data["s"]), snapshot=parse_time(data["n"]), stream=data["k"],
+            after=data["a"],
+        )
+    except (TypeError, ValueError, KeyError, binascii.Error):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    if not (isinstance(position.stream, int) and 0 <= position.stream < len(STREAMS)
+            and isinstance(position.after, int)):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    return position
+
+
+def get_querysets(user: User, since: Optional[datetime.datetime]) -> dict:
+    """Querysets of the STREAMS changed after `since`, the active objects for the first sync"""
+    user_boards = BoardParticipant.objects.filter(user=user).values("board_id")
+    boards = Board.objects.filter(id__in=user_boards)
+    categories = GoalCategory.objects.visible_to(user).select_related("user")
+    goals = Goal.objects.visible_to(user).select_related("user")
+    comments = GoalComment.objects.visible_to(user).select_related("user")
+
+    if since is None:
+        return {
+            "boards": boards.exclude(is_deleted=True),
+            "categories": categories.exclude(is_deleted=True),
+            "goals": goals.exclude(status=Goal.Status.archived),
+            "comments": comments,
+            "tombstones": Tombstone.objects.none(),
+        }
+
+    # Changes committed shortly before the previous sync may have an earlier `updated`
+    since -= datetime.timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+    # Everything on a board the user joined is new to the user
+    joined = BoardParticipant.objects.filter(user=user, created__gt=since).values("board_id")
+    changed = Q(updated__gt=since) | Q(board__in=joined)
+    return {
+        "boards": boards.filter(Q(updated__gt=since) | Q(id__in=joined)),
+        "categories": categories.filter(changed),
+        "goals": goals.filter(changed),
+        "comments": comments.filter(changed),
+        "tombstones": Tombstone.objects.filter(
+            Q(board__in=user_boards, user=None) | Q(user=user), created__gt=since
+        ).exclude(
+            # The user has joined the board again
+            kind=Tombstone.Kind.board, board__in=user_boards
+        ),
+    }
+
+
+def get_changes(user: User, position: SyncPosition, page_size: int) -> dict:
+    """
+    A page of at most `page_size` objects of the user's boards changed after `since` and
+    of the ids of the removed ones. The first sync gets every active object. A removed goal
+    takes its comments with it. The pages go through the STREAMS one after another by id,
+    objects changed while paging come again with the next sync
+    """
+    retention = datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    if position.since is not None and position.since < timezone.now() - retention:
+        raise ResyncRequired
+
+    querysets = get_querysets(user, position.since)
+    rows = {name: [] for name in STREAMS}
+    stream, after, left = position.stream, position.after, page_size
+    while stream < len(STREAMS) and left:
+        page = list(querysets[STREAMS[stream]].filter(id__gt=after).order_by("id")[:left + 1])
+        if len(page) > left:
+            rows[STREAMS[stream]] = page[:left]
+            after = page[left - 1].id
+            break
+        rows[STREAMS[stream]] = page
+        left -= len(page)
+        stream, after = stream + 1, 0
+    has_more = stream < len(STREAMS)
+
+    boards, categories, goals = rows["boards"], rows["categories"], rows["goals"]
+    tombstones = [(tombstone.kind, tombstone.object_id) for tombstone in rows["tombstones"]]
+    moved = {object_id for kind, object_id in tombstones if kind == Tombstone.Kind.goal}
+    # A goal moved to another board of the user is not removed
+    present = {Tombstone.Kind.goal: set(
+        Goal.objects.visible_to(user).filter(id__in=moved).exclude(status=Goal.Status.archived).values_list(
+            "id", flat=True
+        )
+    ) if moved else set()}
+    removed = {kind: {
+        object_id for tombstone_kind, object_id in tombstones
+        if tombstone_kind == kind and object_id not in present.get(kind, ())
+    } for kind in Tombstone.Kind}
+
+    return {
+        "cursor": encode_cursor(position._replace(stream=stream, after=after), has_more),
+        "has_more": has_more,
+        "boards": [board for board in boards if not board.is_deleted],
+        "categories": [category for category in categories if not category.is_deleted],
+        "goals": [goal for goal in goals if goal.status != Goal.Status.archived],
+        "comments": rows["comments"],
+        "deleted": {
+            "boards": sorted({board.id for board in boards if board.is_deleted} | removed[Tombstone.Kind.board]),
+            "categories": [category.id for category in categories if category.is_deleted],
+            "goals": sorted(
+                {goal.id for goal in goals if goal.status == Goal.Status.archived} | removed[Tombstone.Kind.goal]
+            ),
+            "comments": sorted(removed[Tombstone.Kind.comment]),
+        },
+    }
+
+
+def prune_tombstones() -> int:
+    """Deletes the tombstones older than the retention, returns their number"""
+    cutoff = timezone.now() - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    return Tombstone.objects.filter(created__lt=cutoff).delete()[0]
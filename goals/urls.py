@@ -9,6 +9,8 @@ urlpatterns = [
 
     path("goal/create", views.GoalCreateView.as_view()),
     path("goal/list", views.GoalListView.as_view()),
+    path("goal/batch", views.GoalBatchView.as_view()),
+    path("goal/import", views.GoalImportView.as_view()),
     path("goal/<pk>", views.GoalView.as_view()),
 
     path("goal_comment/create", views.GoalCommentCreateView.as_view()),
@@ -18,4 +20,15 @@ urlpatterns = [
     path("board/create", views.BoardCreateView.as_view()),
     path("board/list", views.BoardListView.as_view()),
     path("board/<pk>", views.BoardView.as_view()),
+    path("board/<pk>/snapshot", views.BoardSnapshotView.as_view()),
+    path("board/<pk>/export", views.BoardExportView.as_view()),
+    path("board/<pk>/stats", views.BoardStatsView.as_view()),
+    path("board/<int:board_pk>/participant/create", views.BoardParticipantCreateView.as_view()),
+    path("board/<int:board_pk>/participant/list", views.BoardParticipantListView.as_view()),
+    path("board/<int:board_pk>/participant/<pk>", views.BoardParticipantView.as_view()),
+
+    path("archive_job/list", views.ArchiveJobListView.as_view()),
+    path("archive_job/<pk>", views.ArchiveJobView.as_view()),
+
+    path("sync", views.SyncView.as_view()),
 ]
\ No newline at end of file
@@ -0,0 +1,27 @@
+from django.apps import apps
+from django.db.models import F
+from core.models import User
+
+# goals.models imports this module, so the models are looked up when called
+
+
+def get_board_versions(board_ids) -> dict[int, int]:
+    """Current versions of the boards"""
+    board_model = apps.get_model("goals", "Board")
+    return dict(board_model.objects.filter(id__in=board_ids).values_list("id", "version"))
+
+
+def get_user_board_versions(user: User) -> dict[int, int]:
+    """Current versions of the boards the user participates in, with one query"""
+    participant_model = apps.get_model("goals", "BoardParticipant")
+    return dict(participant_model.objects.filter(user=user).values_list("board_id", "board__version"))
+
+
+def bump_boards(*board_ids: int):
+    """
+    Gives the boards new versions. The version is a column of the board, so every process
+    sees it and a bump in a transaction becomes visible together with the change it stands for
+    """
+    board_ids = {board_id for board_id in board_ids if board_id is not None}
+    if board_ids:
+        apps.get_model("goals", "Board").objects.filter(id__in=board_ids).update(version=F("version") + 1)
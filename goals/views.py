@@ -1,16 +1,34 @@
+import codecs
+from typing import Optional
+from django.conf import settings
 from django.db import transaction
-from django.db.models import QuerySet
-from rest_framework.generics import CreateAPIView, ListAPIView, RetrieveUpdateDestroyAPIView
+from django.db.models import Prefetch, QuerySet
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.generics import CreateAPIView, GenericAPIView, ListAPIView, RetrieveAPIView, \
+    RetrieveUpdateDestroyAPIView
 from rest_framework.pagination import LimitOffsetPagination
-from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.caching import CachedListMixin, ConditionalGetMixin
+from goals.export import EXPORT_TYPES
+from goals.importer import IMPORT_CONTENT_TYPES, IMPORT_TYPES, GoalImporter, iter_progress_lines, iter_records
+from goals.membership import can_read, can_write, get_checked_version
+from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant, ArchiveJob
 from goals.serializers import GoalCategoryCreateSerializer, GoalCategorySerializer, GoalCreateSerializer, GoalSerializer,\
     GoalCommentCreateSerializer, GoalCommentSerializer, BoardCreateSerializer, BoardParticipantSerializer, \
-    BoardSerializer, BoardListSerializer
-from rest_framework.filters import OrderingFilter, SearchFilter
+    BoardSerializer, BoardListSerializer, GoalBatchSerializer, BoardSnapshotSerializer, SyncSerializer, \
+    ArchiveJobSerializer, BoardParticipantCreateSerializer, BoardParticipantUpdateSerializer, BoardStatsSerializer
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
-from goals.filters import GoalDateFilter
-from goals.permissions import GoalCategoryPermission, GoalPermission, CommentPermission, BoardPermission
+from goals.filters import FullTextSearchFilter, GoalDateFilter
+from goals.pagination import CommentPagination, GoalPagination, KeysetPagination, parse_positive_int
+from goals.stats import get_cached_board_stats
+from goals.sync import decode_cursor, get_changes
+from goals.permissions import GoalCategoryPermission, GoalPermission, CommentPermission, BoardPermission, \
+    BoardParticipantPermission
+from rest_framework.exceptions import UnsupportedMediaType, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
 
 
 class GoalCategoryCreateView(CreateAPIView):
@@ -20,19 +38,19 @@ class GoalCategoryCreateView(CreateAPIView):
     serializer_class = GoalCategoryCreateSerializer
 
 
-class GoalCategoryListView(ListAPIView):
+class GoalCategoryListView(CachedListMixin, ListAPIView):
     """API endpoint for retrieving a list of categories"""
     model = GoalCategory
     permission_classes: list = [IsAuthenticated]
     serializer_class = GoalCategorySerializer
     pagination_class = LimitOffsetPagination
-    filter_backends: list = [OrderingFilter, SearchFilter, DjangoFilterBackend]
+    filter_backends: list = [OrderingFilter, FullTextSearchFilter, DjangoFilterBackend]
     ordering_fields: list[str, ...] = ["title", "created"]
     ordering: list[str, ...] = ["title"]
     search_fields: list[str, ...] = ["title"]
 
     def get_queryset(self) -> QuerySet[GoalCategory]:
-        return GoalCategory.objects.filter(board__participants__user=self.request.user).exclude(is_deleted=True)
+        return GoalCategory.objects.visible_to(self.request.user).exclude(is_deleted=True).select_related("user")
 
 
 class GoalCategoryView(RetrieveUpdateDestroyAPIView):
@@ -42,13 +60,14 @@ class GoalCategoryView(RetrieveUpdateDestroyAPIView):
     permission_classes: list = [GoalCategoryPermission]
 
     def get_queryset(self) -> QuerySet[GoalCategory]:
-        return GoalCategory.objects.filter(board__participants__user=self.request.user).exclude(is_deleted=True)
+        return GoalCategory.objects.visible_to(self.request.user).exclude(is_deleted=True).select_related("user")
 
     def perform_destroy(self, instance: GoalCategory):
         with transaction.atomic():
             instance.is_deleted = True
-            instance.save(update_fields=('is_deleted',))
-            Goal.objects.filter(category=instance).update(status=Goal.Status.archived)
+            instance.save(update_fields=('is_deleted', 'updated'))
+            # The goals are archived by the run_archive_jobs worker
+            ArchiveJob.objects.create(board_id=instance.board_id, category=instance)
 
 
 class GoalCreateView(CreateAPIView):
@@ -58,20 +77,64 @@ class GoalCreateView(CreateAPIView):
     serializer_class = GoalCreateSerializer
 
 
-class GoalListView(ListAPIView):
+class GoalBatchView(GenericAPIView):
+    """API endpoint for creating/updating/archiving goals in a batch"""
+    model = Goal
+    permission_classes: list = [IsAuthenticated]
+    serializer_class = GoalBatchSerializer
+
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({"results": serializer.save()})
+
+
+class GoalImportView(GenericAPIView):
+    """
+    API endpoint for importing goals from an NDJSON or CSV (`?type=csv`) request body.
+    The body is read and imported in chunks of `chunk_size` rows while the progress
+    and the errors of every chunk are streamed back as NDJSON
+    """
+    model = Goal
+    permission_classes: list = [IsAuthenticated]
+
+    def initial(self, request: Request, *args, **kwargs):
+        # Checked before the authentication, whose CSRF check reads a form body into memory
+        import_type = request.query_params.get("type", "ndjson")
+        if import_type not in IMPORT_TYPES:
+            raise ValidationError({"type": [f"Choose one of: {', '.join(IMPORT_TYPES)}"]})
+        if request.content_type.split(";")[0].strip().lower() != IMPORT_CONTENT_TYPES[import_type]:
+            raise UnsupportedMediaType(request.content_type)
+        super().initial(request, *args, **kwargs)
+
+    def post(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        import_type = request.query_params.get("type", "ndjson")
+        try:
+            chunk_size = parse_positive_int(request.query_params["chunk_size"], cutoff=settings.IMPORT_MAX_CHUNK_SIZE)
+        except (KeyError, ValueError):
+            chunk_size = settings.IMPORT_CHUNK_SIZE
+
+        importer = GoalImporter(request.user, chunk_size, can_write=lambda board_id: can_write(request, board_id))
+        lines = codecs.iterdecode(request.stream or (), "utf-8", errors="replace")
+        progress = importer.run(iter_records(lines, import_type))
+        return StreamingHttpResponse(iter_progress_lines(progress), content_type="application/x-ndjson")
+
+
+class GoalListView(ConditionalGetMixin, CachedListMixin, ListAPIView):
     """API endpoint for retrieving a list of goals"""
     model = Goal
     permission_classes: list = [IsAuthenticated]
     serializer_class = GoalSerializer
-    pagination_class = LimitOffsetPagination
-    filter_backends: list = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = GoalPagination
+    filter_backends: list = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
     filterset_class = GoalDateFilter
     search_fields: list[str, ...] = ["title", "description"]
+    search_vector_field: str = "search_vector"
     ordering_fields: list[str, ...] = ["priority", "due_date"]
     ordering: list[str, ...] = ["priority", "due_date"]
 
     def get_queryset(self) -> QuerySet[Goal]:
-        return Goal.objects.filter(category__board__participants__user=self.request.user)
+        return Goal.objects.visible_to(self.request.user).select_related("user")
 
 
 class GoalView(RetrieveUpdateDestroyAPIView):
@@ -81,11 +144,11 @@ class GoalView(RetrieveUpdateDestroyAPIView):
     serializer_class = GoalSerializer
 
     def get_queryset(self) -> QuerySet[Goal]:
-        return Goal.objects.filter(category__board__participants__user=self.request.user)
+        return Goal.objects.visible_to(self.request.user).select_related("user", "category")
 
     def perform_destroy(self, instance: Goal):
         instance.status = Goal.Status.archived
-        instance.save(update_fields=('status',))
+        instance.save(update_fields=('status', 'updated'))
 
 
 class GoalCommentCreateView(CreateAPIView):
@@ -95,18 +158,16 @@ class GoalCommentCreateView(CreateAPIView):
     permission_classes: list = [IsAuthenticated]
 
 
-class GoalCommentListView(ListAPIView):
-    """API endpoint for retrieving a list of comments"""
+class GoalCommentListView(ConditionalGetMixin, ListAPIView):
+    """API endpoint for retrieving a list of comments, newest first, page by page with the `next` cursor"""
     serializer_class = GoalCommentSerializer
     permission_classes: list = [IsAuthenticated]
-    # pagination_class = LimitOffsetPagination
-    filter_backends: list = [OrderingFilter, DjangoFilterBackend]
-    # ordering_fields = ["text", "created"]
+    pagination_class = CommentPagination
+    filter_backends: list = [DjangoFilterBackend]
     filterset_fields = ['goal']
-    ordering = ["-created"]
 
     def get_queryset(self) -> QuerySet[GoalComment]:
-        return GoalComment.objects.filter(goal__category__board__participants__user=self.request.user)
+        return GoalComment.objects.visible_to(self.request.user).select_related("user")
 
 
 class CommentView(RetrieveUpdateDestroyAPIView):
@@ -116,7 +177,7 @@ class CommentView(RetrieveUpdateDestroyAPIView):
     permission_classes: list = [CommentPermission]
 
     def get_queryset(self) -> QuerySet[GoalComment]:
-        return GoalComment.objects.filter(goal__category__board__participants__user=self.request.user)
+        return GoalComment.objects.visible_to(self.request.user).select_related("user")
 
 
 class BoardCreateView(CreateAPIView):
@@ -139,18 +200,162 @@ class BoardListView(ListAPIView):
         return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
 
 
-class BoardView(RetrieveUpdateDestroyAPIView):
+class BoardView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     """API endpoint for retrieving/updating/deleting a board"""
     model = Board
     serializer_class = BoardSerializer
     permission_classes: list = [BoardPermission]
 
     def get_queryset(self) -> QuerySet[Board]:
-        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False).prefetch_related(
+            Prefetch("participants", queryset=BoardParticipant.objects.select_related("user"))
+        )
+
+    def get_board_versions(self, request: Request) -> Optional[dict[int, int]]:
+        if not str(self.kwargs["pk"]).isdigit():
+            return None
+        board_id = int(self.kwargs["pk"])
+        # The permission check has read the version already
+        return {board_id: get_checked_version(request, board_id)} if can_read(request, board_id) else None
 
     def perform_destroy(self, instance: Board):
         with transaction.atomic():
             instance.is_deleted = True
             instance.save()
-            instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived)
+            # The categories and goals are archived by the run_archive_jobs worker
+            ArchiveJob.objects.create(board=instance)
+
+
+class BoardSnapshotView(RetrieveAPIView):
+    """API endpoint for retrieving a board with its categories and goals in one request"""
+    model = Board
+    serializer_class = BoardSnapshotSerializer
+    permission_classes: list = [BoardPermission]
+
+    def get_queryset(self) -> QuerySet[Board]:
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False).prefetch_related(
+            Prefetch("participants", queryset=BoardParticipant.objects.select_related("user")),
+            Prefetch(
+                "categories",
+                queryset=GoalCategory.objects.filter(is_deleted=False).select_related("user").order_by("title"),
+                to_attr="active_categories",
+            ),
+            Prefetch(
+                "goals",
+                queryset=Goal.objects.filter(category__is_deleted=False).exclude(
+                    status=Goal.Status.archived
+                ).select_related("user").order_by("priority", "due_date", "id"),
+                to_attr="active_goals",
+            ),
+        )
+
+
+class BoardExportView(GenericAPIView):
+    """
+    API endpoint for streaming goals and comments of a board as NDJSON or CSV (`?type=csv`),
+    rows are read in chunks so memory does not grow with the board
+    """
+    model = Board
+    permission_classes: list = [BoardPermission]
+
+    def get_queryset(self) -> QuerySet[Board]:
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+
+    def get(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        board = self.get_object()
+        export_type = request.query_params.get("type", "ndjson")
+        if export_type not in EXPORT_TYPES:
+            raise ValidationError({"type": [f"Choose one of: {', '.join(EXPORT_TYPES)}"]})
+
+        lines, content_type, extension = EXPORT_TYPES[export_type]
+        response = StreamingHttpResponse(lines(board.id), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="board-{board.id}.{extension}"'
+        return response
+
+
+class BoardStatsView(GenericAPIView):
+    """
+    API endpoint for retrieving the goal statistics of a board for dashboards,
+    computed in the database and cached until the board changes
+    """
+    model = Board
+    permission_classes: list = [BoardPermission]
+    serializer_class = BoardStatsSerializer
+
+    def get_queryset(self) -> QuerySet[Board]:
+        return Board.objects.filter(participants__user=self.request.user, is_deleted=False)
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        board = self.get_object()
+        return Response(self.get_serializer(get_cached_board_stats(board)).data)
+
+
+class BoardParticipantCreateView(CreateAPIView):
+    """API endpoint for adding one participant to a board"""
+    model = BoardParticipant
+    permission_classes: list = [BoardParticipantPermission]
+    serializer_class = BoardParticipantCreateSerializer
+
+    def perform_create(self, serializer: BoardParticipantCreateSerializer):
+        serializer.save(board=get_object_or_404(Board, pk=self.kwargs["board_pk"], is_deleted=False))
+
+
+class BoardParticipantListView(ListAPIView):
+    """API endpoint for retrieving the participants of a board page by page"""
+    model = BoardParticipant
+    permission_classes: list = [BoardParticipantPermission]
+    serializer_class = BoardParticipantSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self) -> QuerySet[BoardParticipant]:
+        return BoardParticipant.objects.filter(
+            board_id=self.kwargs["board_pk"], board__is_deleted=False
+        ).select_related("user").order_by("id")
+
+
+class BoardParticipantView(RetrieveUpdateDestroyAPIView):
+    """API endpoint for retrieving/changing the role of/removing one participant of a board"""
+    model = BoardParticipant
+    permission_classes: list = [BoardParticipantPermission]
+    serializer_class = BoardParticipantUpdateSerializer
+
+    def get_queryset(self) -> QuerySet[BoardParticipant]:
+        return BoardParticipant.objects.filter(
+            board_id=self.kwargs["board_pk"], board__is_deleted=False
+        ).select_related("user")
+
+
+class ArchiveJobListView(ListAPIView):
+    """API endpoint for retrieving a list of archive jobs of deleted boards and categories"""
+    model = ArchiveJob
+    permission_classes: list = [IsAuthenticated]
+    serializer_class = ArchiveJobSerializer
+    pagination_class = LimitOffsetPagination
+    filter_backends: list = [DjangoFilterBackend]
+    filterset_fields: list[str] = ["board", "category", "status"]
+
+    def get_queryset(self) -> QuerySet[ArchiveJob]:
+        return ArchiveJob.objects.visible_to(self.request.user).order_by("-id")
+
+
+class ArchiveJobView(RetrieveAPIView):
+    """API endpoint for retrieving the status and the progress of an archive job"""
+    model = ArchiveJob
+    permission_classes: list = [IsAuthenticated]
+    serializer_class = ArchiveJobSerializer
+
+    def get_queryset(self) -> QuerySet[ArchiveJob]:
+        return ArchiveJob.objects.visible_to(self.request.user)
+
+
+class SyncView(GenericAPIView):
+    """
+    API endpoint for retrieving the objects changed since the `cursor` of the previous response,
+    everything for the first request without a cursor
+    """
+    permission_classes: list = [IsAuthenticated]
+    serializer_class = SyncSerializer
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        position = decode_cursor(request.query_params.get("cursor"))
+        return Response(self.get_serializer(get_changes(request.user, position, settings.SYNC_PAGE_SIZE)).data)
@@ -0,0 +1,246 @@
+"""
+Query-count and latency regression benchmark of the REST API.
+
+Seeds a realistic amount of boards, goals and comments and calls every route
+of goals/urls.py, core/urls.py and bot/urls.py. A route fails when its query
+count or its 95th percentile latency exceeds the budget in budgets.json.
+
+    BENCHMARK=1 pytest tests/benchmarks -s             # check the budgets
+    BENCHMARK=1 BENCHMARK_RECORD=1 pytest tests/benchmarks -s   # record new budgets
+
+BENCHMARK_BOARDS, BENCHMARK_GOALS, BENCHMARK_COMMENTS and BENCHMARK_ROUNDS
+change the size of the seed and the number of timed calls of every route.
+"""
+import gc
+import io
+import itertools
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from bot.models import TgUser
+from core.models import User
+from goals.models import ArchiveJob, BoardParticipant
+from tests.factories import BoardFactory, CategoryFactory, CommentFactory, GoalFactory, ParticipantFactory, \
+    UserFactory
+
+BUDGETS_PATH = Path(__file__).with_name('budgets.json')
+RUN = os.environ.get('BENCHMARK') == '1'
+RECORD = os.environ.get('BENCHMARK_RECORD') == '1'
+BOARDS = int(os.environ.get('BENCHMARK_BOARDS', 2000))
+GOALS = int(os.environ.get('BENCHMARK_GOALS', 20000))
+COMMENTS = int(os.environ.get('BENCHMARK_COMMENTS', 20000))
+ROUNDS = int(os.environ.get('BENCHMARK_ROUNDS', 20))
+USER_BOARDS = 50
+PASSWORD = 'developer789!'
+# Recorded latency budgets leave room for slower machines
+LATENCY_HEADROOM = 3
+
+
+def seed():
+    """Bulk creates the benchmark data with the factories, returns the objects used by the routes"""
+    users = User.objects.bulk_create(
+        [UserFactory.build(username=f'bench{i}', email=f'bench{i}@example.com') for i in range(200)]
+    )
+    user = User.objects.create_user(username='bench', password=PASSWORD)
+    boards = BoardFactory._meta.model.objects.bulk_create(
+        [BoardFactory.build(title=f'board {i}') for i in range(BOARDS)]
+    )
+    BoardParticipant.objects.bulk_create(
+        [ParticipantFactory.build(board=board, user=users[i % len(users)]) for i, board in enumerate(boards)]
+        + [ParticipantFactory.build(board=board, user=user, role=BoardParticipant.Role.writer)
+           for board in boards[1:USER_BOARDS]]
+        + [ParticipantFactory.build(board=boards[0], user=user)]
+        + [ParticipantFactory.build(board=boards[0], user=users[1], role=BoardParticipant.Role.reader)]
+    )
+    categories = CategoryFactory._meta.model.objects.bulk_create(
+        [CategoryFactory.build(title=f'category {i}', board=board, user=user if i < USER_BOARDS else users[0])
+         for i, board in enumerate(itertools.islice(itertools.cycle(boards), len(boards) * 3))]
+    )
+    goals = GoalFactory._meta.model.objects.bulk_create(
+        [GoalFactory.build(category=category, board=category.board, user=category.user,
+                           status=i % 4 + 1, priority=i % 4 + 1)
+         for i, category in zip(range(GOALS), itertools.cycle(categories))],
+        batch_size=2000,
+    )
+    comments = CommentFactory._meta.model.objects.bulk_create(
+        [CommentFactory.build(goal=goal, board=goal.board, user=goal.user)
+         for _, goal in zip(range(COMMENTS), itertools.cycle(goals))],
+        batch_size=2000,
+    )
+    goal = next(goal for goal in goals if goal.user_id == user.id)
+    ArchiveJob.objects.bulk_create([ArchiveJob(board=board, status=ArchiveJob.Status.done) for board in boards[1:10]])
+    # The bulk inserts skip the counters
+    call_command('recount_counters', batch_size=5000, stdout=io.StringIO())
+    return {
+        'user': user,
+        'board': boards[0],
+        'category': categories[0],
+        'goal': goal,
+        'comment': next(comment for comment in comments if comment.goal_id == goal.id),
+        'archive_job': ArchiveJob.objects.first(),
+        'participant': BoardParticipant.objects.get(board=boards[0], user=users[1]),
+    }
+
+
+def get_scenarios(objects):
+    """Route -> (method, url, payload factory) of one call of every route"""
+    counter = itertools.count()
+    board, category, goal, comment = objects['board'], objects['category'], objects['goal'], objects['comment']
+    archive_job, participant = objects['archive_job'], objects['participant']
+    roles = itertools.cycle([BoardParticipant.Role.writer, BoardParticipant.Role.reader])
+    passwords = itertools.cycle([(PASSWORD, 'developer790!'), ('developer790!', PASSWORD)])
+
+    def verification_code():
+        code = f'bench{next(counter):07d}'
+        TgUser.objects.create(tg_id=next(counter), tg_chat_id=1, verification_code=code)
+        return {'verification_code': code}
+
+    def new_participant():
+        user = User.objects.create(username=f'member{next(counter)}')
+        return {'role': BoardParticipant.Role.reader, 'user': user.username}
+
+    def new_password():
+        # A password change ends the session of the user
+        objects['client'].force_login(User.objects.get(username='bench'))
+        old, new = next(passwords)
+        return {'old_password': old, 'new_password': new}
+
+    return {
+        'goals/goal_category/create': ('post', '/goals/goal_category/create',
+                                       lambda: {'title': 'category', 'board': board.id}),
+        'goals/goal_category/list': ('get', '/goals/goal_category/list?limit=100', None),
+        'goals/goal_category/<pk>': ('get', f'/goals/goal_category/{category.id}', None),
+        'goals/goal/create': ('post', '/goals/goal/create', lambda: {'title': 'goal', 'category': category.id}),
+        'goals/goal/list': ('get', '/goals/goal/list?limit=100', None),
+        'goals/goal/batch': ('post', '/goals/goal/batch', lambda: {
+            'operations': [{'op': 'create', 'title': 'goal', 'category': category.id} for _ in range(50)]
+        }),
+        'goals/goal/<pk>': ('get', f'/goals/goal/{goal.id}', None),
+        'goals/goal_comment/create': ('post', '/goals/goal_comment/create',
+                                      lambda: {'text': 'comment', 'goal': goal.id}),
+        'goals/goal_comment/list': ('get', f'/goals/goal_comment/list?goal={goal.id}', None),
+        'goals/goal_comment/<pk>': ('get', f'/goals/goal_comment/{comment.id}', None),
+        'goals/board/create': ('post', '/goals/board/create', lambda: {'title': 'board'}),
+        'goals/board/list': ('get', '/goals/board/list?limit=100', None),
+        'goals/board/<pk>': ('get', f'/goals/board/{board.id}', None),
+        'goals/board/<pk>/snapshot': ('get', f'/goals/board/{board.id}/snapshot', None),
+        'goals/board/<pk>/stats': ('get', f'/goals/board/{board.id}/stats', None),
+        'goals/board/<pk>/export': ('get', f'/goals/board/{board.id}/export?type=csv', None),
+        'goals/board/<int:board_pk>/participant/create': ('post', f'/goals/board/{board.id}/participant/create',
+                                                          new_participant),
+        'goals/board/<int:board_pk>/participant/list': ('get', f'/goals/board/{board.id}/participant/list', None),
+        'goals/board/<int:board_pk>/participant/<pk>': (
+            'patch', f'/goals/board/{board.id}/participant/{participant.id}', lambda: {'role': next(roles)}
+        ),
+        'goals/archive_job/list': ('get', '/goals/archive_job/list?limit=100', None),
+        'goals/archive_job/<pk>': ('get', f'/goals/archive_job/{archive_job.id}', None),
+        'goals/sync': ('get', '/goals/sync', None),
+        # After the other goals routes, the imported goals would change their size
+        'goals/goal/import': ('post', '/goals/goal/import?chunk_size=500', lambda: '\n'.join(
+            json.dumps({'title': f'imported {i}', 'category': category.id}) for i in range(1000)
+        )),
+        'core/signup': ('post', '/core/signup', lambda: {
+            'username': f'signup{next(counter)}', 'password': PASSWORD, 'password_repeat': PASSWORD
+        }),
+        'core/login': ('post', '/core/login', lambda: {'username': 'bench', 'password': PASSWORD}),
+        'core/profile': ('get', '/core/profile', None),
+        'bot/verify': ('patch', '/bot/verify', verification_code),
+        'bot/webhook': ('post', '/bot/webhook', lambda: {'update_id': next(counter), 'message': {
+            'message_id': 1, 'chat': {'id': 1, 'type': 'private'}, 'text': '/goals',
+            'from': {'id': 1, 'first_name': 'bench', 'last_name': None, 'username': 'bench'},
+        }}),
+        'core/update_password': ('put', '/core/update_password', new_password),
+    }
+
+
+def get_routes():
+    """Every route of the benchmarked URL configurations with its prefix"""
+    routes = set()
+    for prefix in ('goals/', 'core/', 'bot/'):
+        resolver = next(pattern for pattern in get_resolver().url_patterns
+                        if isinstance(pattern, URLResolver) and str(pattern.pattern) == prefix)
+        routes |= {prefix + str(pattern.pattern) for pattern in resolver.url_patterns
+                   if isinstance(pattern, URLPattern)}
+    return routes
+
+
+def measure(client, method, url, payload):
+    """Query count and wall-clock time of the calls of one route"""
+    queries, timings = [], []
+    for _ in range(ROUNDS + 1):
+        data = payload() if payload else None
+        # Collections of the seeded objects would land on random routes
+        gc.collect()
+        gc.disable()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            # A text payload is the NDJSON body of the import
+            content_type = 'application/x-ndjson' if isinstance(data, str) else 'application/json'
+            response = getattr(client, method)(url, data, content_type=content_type) if data is not None \
+                else getattr(client, method)(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+        gc.enable()
+        assert response.status_code < 300, (url, response.status_code, getattr(response, 'data', None))
+        queries.append(len(context.captured_queries))
+    # The first call warms up the caches
+    queries, timings = queries[1:], timings[1:]
+    return {
+        'queries': max(queries),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0], 2),
+    }
+
+
+def test_every_route_has_benchmark():
+    """Testing that every route of the API is covered by the benchmark"""
+    objects = {key: SimpleNamespace(id=0) for key in ('board', 'category', 'goal', 'comment', 'archive_job',
+                                                           'participant')}
+
+    assert get_routes() == set(get_scenarios(objects))
+    assert get_routes() == set(json.loads(BUDGETS_PATH.read_text()))
+
+
+@pytest.mark.skipif(not RUN, reason='set BENCHMARK=1 to run the benchmark')
+@pytest.mark.django_db
+def test_routes_benchmark(client, settings):
+    """Checks the query count and the latency of every route against the recorded budgets"""
+    settings.BOT_WEBHOOK_SECRET = 'bench'
+    client.defaults['HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN'] = 'bench'
+    objects = seed()
+    objects['client'] = client
+    client.force_login(objects['user'])
+
+    results = {route: measure(client, *scenario) for route, scenario in get_scenarios(objects).items()}
+    budgets = json.loads(BUDGETS_PATH.read_text())
+
+    print(f'\n{"route":46} {"queries":>8} {"budget":>7} {"p50 ms":>9} {"p95 ms":>9} {"budget":>9}')
+    for route, result in sorted(results.items()):
+        budget = budgets.get(route, {})
+        print(f'{route:46} {result["queries"]:>8} {budget.get("queries", "-"):>7} {result["p50_ms"]:>9} '
+              f'{result["p95_ms"]:>9} {budget.get("p95_ms", "-"):>9}')
+
+    if RECORD:
+        BUDGETS_PATH.write_text(json.dumps({
+            route: {'queries': result['queries'], 'p95_ms': round(result['p95_ms'] * LATENCY_HEADROOM, 1)}
+            for route, result in sorted(results.items())
+        }, indent=2) + '\n')
+        return
+
+    over_budget = [
+        f'{route}: {result["queries"]} queries, p95 {result["p95_ms"]} ms'
+        for route, result in results.items()
+        if result['queries'] > budgets[route]['queries'] or result['p95_ms'] > budgets[route]['p95_ms']
+    ]
+    assert not over_budget, over_budget
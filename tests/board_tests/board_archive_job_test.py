@@ -0,0 +1,65 @@
+import pytest
+from django.core.management import call_command
+from django.db import OperationalError
+
+from goals.models import ArchiveJob, Goal
+
+
+@pytest.mark.django_db
+def test_board_archive_job(client, create_category):
+    """Testing that the deletion of a board returns at once and the worker archives it in batches"""
+    for _ in range(5):
+        client.post('/goals/goal/create', {'title': 'goal', 'category': create_category.data['id']},
+                    content_type='application/json')
+    board_id = create_category.data['board']
+
+    assert client.delete(f'/goals/board/{board_id}').status_code == 204
+    jobs = client.get(f'/goals/archive_job/list?board={board_id}').data
+    assert [(job['status'], job['processed']) for job in jobs] == [(ArchiveJob.Status.pending, 0)]
+    assert not Goal.objects.filter(status=Goal.Status.archived).exists()
+
+    call_command('run_archive_jobs', once=True, batch_size=2)
+
+    job = client.get(f'/goals/archive_job/{jobs[0]["id"]}').data
+    assert (job['status'], job['total'], job['processed']) == (ArchiveJob.Status.done, 5, 5)
+    assert set(Goal.objects.values_list('status', flat=True)) == {Goal.Status.archived}
+    assert client.get(f'/goals/goal_category/{create_category.data["id"]}').status_code == 404
+
+
+@pytest.mark.django_db
+def test_category_archive_job(client, create_goal, create_another_user):
+    """Testing the archiving of the goals of a deleted category and the visibility of the jobs"""
+    client.delete(f'/goals/goal_category/{create_goal.data["category"]}')
+    job = ArchiveJob.objects.get()
+    assert job.category_id == create_goal.data['category']
+
+    call_command('run_archive_jobs', once=True)
+
+    job.refresh_from_db()
+    assert (job.status, job.total, job.processed) == (ArchiveJob.Status.done, 1, 1)
+    assert Goal.objects.get().status == Goal.Status.archived
+
+    client.logout()
+    client.login(username='archi1', password='developer789!1')
+    assert client.get('/goals/archive_job/list').data == []
+    assert client.get(f'/goals/archive_job/{job.id}').status_code == 404
+
+
+def test_archive_worker_survives_errors(monkeypatch):
+    """Testing that the worker loop logs a failed poll, drops the broken connections and polls again"""
+    polls, closes = [], []
+
+    def run_pending_jobs(batch_size):
+        polls.append(batch_size)
+        if len(polls) == 1:
+            raise OperationalError('server closed the connection unexpectedly')
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr('goals.management.commands.run_archive_jobs.run_pending_jobs', run_pending_jobs)
+    monkeypatch.setattr('goals.management.commands.run_archive_jobs.close_old_connections',
+                        lambda: closes.append(True))
+    monkeypatch.setattr('goals.management.commands.run_archive_jobs.time.sleep', lambda seconds: None)
+    with pytest.raises(KeyboardInterrupt):
+        call_command('run_archive_jobs', batch_size=3)
+    assert polls == [3, 3]
+    assert len(closes) == 2
@@ -17,7 +17,11 @@ def test_board_detail(client, create_login_user):
         "created": board_create.data['created'],
         "updated": board_create.data['updated'],
         "title": "test board",
-        "is_deleted": False
+        "is_deleted": False,
+        "to_do_count": 0,
+        "in_progress_count": 0,
+        "done_count": 0,
+        "archived_count": 0
     }
 
     assert board_create.status_code == 201
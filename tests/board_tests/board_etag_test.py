@@ -0,0 +1,40 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.mark.django_db
+def test_board_etag(client, create_board, create_another_user):
+    """Testing the conditional GET of a board: 304 while the board is unchanged, 200 after a write"""
+    url = f'/goals/board/{create_board.data["id"]}'
+    response = client.get(url)
+    etag = response['ETag']
+    assert response.status_code == 200
+
+    with CaptureQueriesContext(connection) as context:
+        not_modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert not_modified.status_code == 304
+    assert not_modified['ETag'] == etag
+    assert not_modified.content == b''
+    # Only the version of the board is read
+    board_queries = [query['sql'] for query in context.captured_queries if 'goals_board' in query['sql']]
+    assert len(board_queries) == 1 and '"version"' in board_queries[0]
+
+    client.put(url, {'title': 'updated board', 'participants': [{'role': 3, 'user': 'archi1'}]},
+               content_type='application/json')
+    modified = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert modified.status_code == 200
+    assert modified['ETag'] != etag
+    assert modified.data['title'] == 'updated board'
+
+
+@pytest.mark.django_db
+def test_board_etag_of_foreign_board(client, create_board, create_another_user):
+    """Testing that a board of other users is not tagged"""
+    client.logout()
+    client.login(username='archi1', password='developer789!1')
+
+    response = client.get(f'/goals/board/{create_board.data["id"]}', HTTP_IF_NONE_MATCH='*')
+
+    assert response.status_code == 404
+    assert 'ETag' not in response
@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+
+import pytest
+
+
+def read_content(response):
+    assert response.status_code == 200
+    assert response.streaming
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_board_export(client, create_goal):
+    """Testing the NDJSON and CSV export of the goals and comments of a board"""
+    comment = client.post('/goals/goal_comment/create', {'text': 'comment, "quoted"', 'goal': create_goal.data['id']},
+                          content_type='application/json')
+    board_id = client.get('/goals/board/list').data[0]['id']
+
+    response = client.get(f'/goals/board/{board_id}/export')
+    rows = [json.loads(line) for line in read_content(response).splitlines()]
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert [(row['type'], row['id']) for row in rows] == [('goal', create_goal.data['id']),
+                                                          ('comment', comment.data['id'])]
+    assert rows[0]['title'] == 'new goal'
+    assert rows[1]['user__username'] == 'archi'
+
+    response = client.get(f'/goals/board/{board_id}/export?type=csv')
+    rows = list(csv.DictReader(io.StringIO(read_content(response))))
+    assert response['Content-Disposition'] == f'attachment; filename="board-{board_id}.csv"'
+    assert [(row['type'], row['id']) for row in rows] == [('goal', str(create_goal.data['id'])),
+                                                          ('comment', str(comment.data['id']))]
+    assert rows[1]['text'] == 'comment, "quoted"'
+
+    assert client.get(f'/goals/board/{board_id}/export?type=xml').status_code == 400
+
+
+@pytest.mark.django_db
+def test_board_export_of_foreign_board(client, create_board, create_another_user):
+    """Testing that a board of other users is not exported"""
+    client.logout()
+    client.login(username='archi1', password='developer789!1')
+
+    assert client.get(f'/goals/board/{create_board.data["id"]}/export').status_code == 404
@@ -22,14 +22,22 @@ def test_boards_list(client, create_login_user):
             "created": board_create_1.data['created'],
             "updated": board_create_1.data['updated'],
             "title": board_create_1.data['title'],
-            "is_deleted": False
+            "is_deleted": False,
+            "to_do_count": 0,
+            "in_progress_count": 0,
+            "done_count": 0,
+            "archived_count": 0
         },
         {
             "id": board_create_2.data['id'],
             "created": board_create_2.data['created'],
             "updated": board_create_2.data['updated'],
             "title": board_create_2.data['title'],
-            "is_deleted": False
+            "is_deleted": False,
+            "to_do_count": 0,
+            "in_progress_count": 0,
+            "done_count": 0,
+            "archived_count": 0
         }
     ]
 
@@ -0,0 +1,48 @@
+import pytest
+
+from goals.models import BoardParticipant, Goal
+from goals.versions import bump_boards
+
+
+@pytest.mark.django_db
+def test_board_membership_cache(client, django_assert_num_queries, create_category, create_another_user):
+    """Testing that object permissions are served from the membership cache and invalidated on update"""
+    board_id = create_category.data['board']
+    create_goal = client.post('/goals/goal/create',
+                              {'title': 'new goal', 'category': create_category.data['id']},
+                              content_type='application/json')
+    client.get(f'/goals/goal/{create_goal.data["id"]}')
+
+    # session, user, goal with category and author, board version
+    with django_assert_num_queries(4):
+        goal_response = client.get(f'/goals/goal/{create_goal.data["id"]}')
+
+    update_board_response = client.put(f'/goals/board/{board_id}',
+                                       data={'participants': [{'role': 3,
+                                                               'user': create_another_user.data['username']}],
+                                             'title': 'updated board'},
+                                       content_type='application/json')
+    client.login(username='archi1', password='developer789!1')
+    reader_response = client.get(f'/goals/goal/{create_goal.data["id"]}')
+    reader_update_response = client.patch(f'/goals/goal/{create_goal.data["id"]}',
+                                          {'title': 'updated goal'},
+                                          content_type='application/json')
+
+    assert goal_response.status_code == 200
+    assert update_board_response.status_code == 200
+    assert reader_response.status_code == 200
+    assert reader_update_response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_board_membership_cache_other_process(client, create_goal):
+    """Testing that a downgrade made by another process, which cannot clear this cache, is seen at once"""
+    goal = Goal.objects.get(id=create_goal.data['id'])
+    assert client.patch(f'/goals/goal/{goal.id}', {'title': 'cached'}, content_type='application/json').status_code == 200
+
+    # Another process changes the role and bumps the version without touching the cache of this one
+    BoardParticipant.objects.filter(board_id=goal.board_id).update(role=BoardParticipant.Role.reader)
+    bump_boards(goal.board_id)
+
+    response = client.patch(f'/goals/goal/{goal.id}', {'title': 'downgraded'}, content_type='application/json')
+    assert response.status_code == 403
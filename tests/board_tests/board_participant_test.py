@@ -0,0 +1,59 @@
+import pytest
+from django.test import Client
+
+from core.models import User
+from goals.models import BoardParticipant, Tombstone
+
+
+@pytest.fixture
+def board_id(client, create_login_user):
+    return client.post('/goals/board/create', {'title': 'test board'}, content_type='application/json').data['id']
+
+
+@pytest.mark.django_db
+def test_board_participant_patch(client, django_assert_max_num_queries, board_id, create_another_user):
+    """Testing adding a participant, changing its role and removing it one by one"""
+    url = f'/goals/board/{board_id}/participant'
+    created = client.post(f'{url}/create', {'role': 3, 'user': 'archi1'}, content_type='application/json')
+    duplicate = client.post(f'{url}/create', {'role': 2, 'user': 'archi1'}, content_type='application/json')
+
+    # session, user, participant, savepoint, update, board version lookups of the signal, release savepoint
+    with django_assert_max_num_queries(7):
+        updated = client.patch(f'{url}/{created.data["id"]}', {'role': 2, 'user': 'archi'},
+                               content_type='application/json')
+    writer = Client()
+    writer.login(username='archi1', password='developer789!1')
+    writer_add = writer.post(f'{url}/create', {'role': 3, 'user': 'archi'}, content_type='application/json')
+    writer_list = writer.get(f'{url}/list')
+
+    owner_id = BoardParticipant.objects.get(board_id=board_id, user__username='archi').id
+    owner_delete = client.delete(f'{url}/{owner_id}')
+    removed = client.delete(f'{url}/{created.data["id"]}')
+    removed_list = writer.get(f'{url}/list')
+
+    assert created.status_code == 201
+    assert created.data['role'] == BoardParticipant.Role.reader
+    assert duplicate.status_code == 400
+    assert updated.status_code == 200
+    assert (updated.data['user'], updated.data['role']) == ('archi1', BoardParticipant.Role.writer)
+    assert writer_add.status_code == 403
+    assert [part['user'] for part in writer_list.data['results']] == ['archi', 'archi1']
+    assert owner_delete.status_code == 403
+    assert removed.status_code == 204
+    assert removed_list.status_code == 403
+    assert Tombstone.objects.filter(board_id=board_id, user__username='archi1').exists()
+
+
+@pytest.mark.django_db
+def test_board_participant_list(client, board_id):
+    """Testing that the participants are listed page by page"""
+    users = User.objects.bulk_create([User(username=f'member{number}', password='x') for number in range(5)])
+    BoardParticipant.objects.bulk_create([
+        BoardParticipant(board_id=board_id, user=user, role=BoardParticipant.Role.reader) for user in users
+    ])
+    first = client.get(f'/goals/board/{board_id}/participant/list?limit=4')
+    second = client.get(first.data['next'])
+
+    assert [part['user'] for part in first.data['results']] == ['archi', 'member0', 'member1', 'member2']
+    assert [part['user'] for part in second.data['results']] == ['member3', 'member4']
+    assert second.data['next'] is None
@@ -0,0 +1,40 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_board_snapshot(client, django_assert_num_queries, create_category):
+    """Testing the board snapshot with categories and goals grouped by status"""
+    board_id = create_category.data['board']
+    category_2 = client.post('/goals/goal_category/create',
+                             {'title': 'another category', 'board': board_id},
+                             format='json')
+    goal_ids = {}
+    for category, status in [(create_category, 1), (category_2, 1), (category_2, 3), (category_2, 4)]:
+        response = client.post('/goals/goal/create',
+                               {'title': 'goal', 'category': category.data['id'], 'status': status},
+                               content_type='application/json')
+        goal_ids.setdefault(status, []).append(response.data['id'])
+    client.get(f'/goals/board/{board_id}/snapshot')
+
+    # session, user, board version of the membership check, board, participants, categories, goals
+    with django_assert_num_queries(7):
+        snapshot_response = client.get(f'/goals/board/{board_id}/snapshot')
+
+    for _ in range(10):
+        client.post('/goals/goal/create',
+                    {'title': 'goal', 'category': category_2.data['id'], 'status': 2},
+                    content_type='application/json')
+    with django_assert_num_queries(7):
+        bigger_snapshot_response = client.get(f'/goals/board/{board_id}/snapshot')
+
+    goals = snapshot_response.data['goals']
+
+    assert snapshot_response.status_code == 200
+    assert [category['title'] for category in snapshot_response.data['categories']] == \
+           ['another category', 'test category']
+    assert snapshot_response.data['participants'][0]['user'] == 'archi'
+    assert [goal['id'] for goal in goals['to_do']] == goal_ids[1]
+    assert [goal['id'] for goal in goals['done']] == goal_ids[3]
+    assert goals['in_progress'] == []
+    assert 'archived' not in goals
+    assert len(bigger_snapshot_response.data['goals']['in_progress']) == 10
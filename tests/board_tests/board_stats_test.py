@@ -0,0 +1,41 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Goal, GoalCategory
+
+
+@pytest.mark.django_db
+def test_board_stats(client, django_assert_num_queries, create_category, create_another_user):
+    """Testing the goal statistics of a board and their cache"""
+    category = GoalCategory.objects.get(pk=create_category.data['id'])
+    owner, other = User.objects.get(username='archi'), User.objects.get(username='archi1')
+    yesterday = timezone.localdate() - datetime.timedelta(days=1)
+    Goal.objects.bulk_create([
+        Goal(title='overdue', category=category, board=category.board, user=owner, due_date=yesterday),
+        Goal(title='high', category=category, board=category.board, user=owner, priority=Goal.Priority.high,
+             status=Goal.Status.in_progress),
+        Goal(title='done', category=category, board=category.board, user=other, status=Goal.Status.done,
+             due_date=yesterday),
+        Goal(title='archived', category=category, board=category.board, user=other, status=Goal.Status.archived),
+    ])
+    url = f'/goals/board/{category.board_id}/stats'
+    stats = client.get(url).data
+
+    # session, user, board version of the membership check, board
+    with django_assert_num_queries(4):
+        cached = client.get(url)
+    client.post('/goals/goal/create', {'title': 'new goal', 'category': category.id}, content_type='application/json')
+
+    assert stats['total'] == 4
+    assert stats['overdue'] == 1
+    assert stats['by_status'] == {'to_do': 1, 'in_progress': 1, 'done': 1, 'archived': 1}
+    assert stats['by_priority'] == {'low': 0, 'medium': 2, 'high': 1, 'critical': 0}
+    assert stats['workload'] == [{'user': 'archi', 'open': 2, 'done': 0, 'overdue': 1},
+                                 {'user': 'archi1', 'open': 0, 'done': 1, 'overdue': 0}]
+    assert cached.data == stats
+    assert client.get(url).data['by_status']['to_do'] == 2
+    client.login(username='archi1', password='developer789!1')
+    assert client.get(url).status_code == 404
@@ -1,4 +1,6 @@
 import pytest
+from core.models import User
+from goals.models import BoardParticipant, Tombstone
 
 
 @pytest.mark.django_db
@@ -47,7 +49,11 @@ def test_board_update(client, create_login_user, create_another_user):
         "created": board_create.data['created'],
         "updated": updated_response.data['updated'],
         "title": "updated board",
-        "is_deleted": False
+        "is_deleted": False,
+        "to_do_count": 0,
+        "in_progress_count": 0,
+        "done_count": 0,
+        "archived_count": 0
     }
 
     assert board_create.status_code == 201
@@ -55,3 +61,34 @@ def test_board_update(client, create_login_user, create_another_user):
     assert update_board_response.status_code == 200
     assert updated_response.data['title'] == 'updated board'
     assert expected_response == check_added_participant_response.data
+
+
+@pytest.mark.django_db
+def test_board_update_participants_diff(client, django_assert_max_num_queries, create_login_user):
+    """Testing that the participants are diffed in memory and written with a constant number of queries"""
+    board_id = client.post('/goals/board/create', {'title': 'test board'}, content_type='application/json').data['id']
+    User.objects.bulk_create([User(username=f'member{number}', password='x') for number in range(60)])
+    url = f'/goals/board/{board_id}'
+
+    def put(participants):
+        return client.put(url, {'title': 'test board', 'participants': participants}, content_type='application/json')
+
+    put([{'role': 3, 'user': f'member{number}'} for number in range(50)])
+    # session, user, board, participants, roles, usernames, savepoint, delete, tombstones, update, insert,
+    # board save, board version, release savepoint, participants of the response
+    with django_assert_max_num_queries(15):
+        response = put([{'role': 2, 'user': f'member{number}'} for number in range(10)]
+                       + [{'role': 3, 'user': f'member{number}'} for number in range(10, 20)]
+                       + [{'role': 3, 'user': f'member{number}'} for number in range(50, 60)])
+
+    roles = {part['user']: part['role'] for part in response.data['participants']}
+    assert response.status_code == 200
+    assert len(roles) == 31
+    assert roles['archi'] == BoardParticipant.Role.owner
+    assert roles['member0'] == roles['member9'] == BoardParticipant.Role.writer
+    assert roles['member10'] == roles['member55'] == BoardParticipant.Role.reader
+    assert 'member20' not in roles
+    assert Tombstone.objects.filter(board_id=board_id, kind=Tombstone.Kind.board).count() == 30
+    assert put([{'role': 3, 'user': 'nobody'}]).data == {
+        'participants': [{'user': ['Object with username=nobody does not exist.']}]
+    }
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+import requests
+
+from bot.tg.client import TgApiError, TgClient, TgUncertainError, get_tg_client
+
+MESSAGE = {'message_id': 1, 'from': {'id': 1, 'first_name': 'bot', 'last_name': None, 'username': None},
+           'chat': {'id': 5, 'type': 'private'}, 'text': 'hi'}
+
+
+def response(status, body):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = json.dumps(body).encode()
+    return resp
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Client with scripted responses, records the calls and the sleeps"""
+    client = TgClient('token', retries=3, backoff=1, max_retry_delay=10)
+    client.calls, client.sleeps, client.script = [], [], []
+
+    def request(method, url, **kwargs):
+        client.calls.append((method, url, kwargs['timeout']))
+        result = client.script.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(client.session, 'request', request)
+    monkeypatch.setattr('bot.tg.client.time.sleep', client.sleeps.append)
+    monkeypatch.setattr('bot.tg.client.random.uniform', lambda low, high: 1)
+    return client
+
+
+def test_tg_client_retries(client):
+    """Testing the retries with backoff on connection errors and 5xx, and retry_after of 429"""
+    client.script = [
+        requests.ConnectTimeout('connect timeout'),
+        response(502, {'ok': False}),
+        response(429, {'ok': False, 'parameters': {'retry_after': 3}}),
+        response(200, {'ok': True, 'result': MESSAGE}),
+    ]
+    sent = client.send_message(5, 'hi')
+
+    assert sent.result.chat.id == 5
+    assert client.sleeps == [1, 2, 3]
+    assert client.calls[0] == ('post', 'https://api.telegram.org/bottoken/sendMessage', (5, 10))
+
+
+def test_tg_client_gives_up(client):
+    """Testing that a long retry_after and the last failed attempt raise"""
+    client.script = [response(429, {'ok': False, 'parameters': {'retry_after': 60}})]
+    with pytest.raises(TgApiError):
+        client.send_message(5, 'hi')
+
+    client.script = [response(500, {'ok': False})] * 4
+    with pytest.raises(TgApiError):
+        client.get_updates(offset=3, timeout=30)
+    # The long poll gets its timeout on top of the read timeout
+    assert client.calls[-1][2] == (5, 40)
+    assert client.sleeps == [1, 2, 4]
+
+
+def test_tg_client_no_repeat_after_sent(client):
+    """Testing that sendMessage is not repeated after a read timeout, and getUpdates is"""
+    client.script = [requests.ReadTimeout('read timeout')]
+    with pytest.raises(TgUncertainError):
+        client.send_message(5, 'hi')
+    assert (len(client.calls), client.sleeps) == (1, [])
+
+    client.script = [requests.ReadTimeout('read timeout'), response(200, {'ok': True, 'result': []})]
+    assert client.get_updates(offset=3, timeout=30).result == []
+    assert client.sleeps == [1]
+
+
+def test_tg_client_is_shared():
+    assert get_tg_client() is get_tg_client()
@@ -0,0 +1,44 @@
+import threading
+
+from bot.dispatcher import UpdateDispatcher
+from bot.tg.dc import Chat, Message, MessageFrom, UpdateObj
+
+
+def update(update_id, chat_id, text=''):
+    return UpdateObj(update_id=update_id, message=Message(
+        message_id=update_id, from_=MessageFrom(id=chat_id, first_name='user', last_name=None, username=None),
+        chat=Chat(id=chat_id, type='private'), text=text,
+    ))
+
+
+def test_dispatcher_orders_updates_of_a_chat():
+    """Testing that a slow chat does not stall the others and the updates of a chat keep their order"""
+    release = threading.Event()
+    handled = []
+
+    def handler(message):
+        if message.text == 'slow':
+            release.wait(5)
+        if message.text == 'fail':
+            raise ValueError('broken update')
+        handled.append((message.chat.id, message.message_id))
+
+    dispatcher = UpdateDispatcher(handler, workers=4)
+    assert dispatcher.submit([update(1, 10, 'slow'), update(2, 10), update(3, 20), update(4, 20, 'fail'),
+                              update(5, 20), UpdateObj(update_id=6)]) == 6
+
+    assert dispatcher.wait_for_offset(1, timeout=0.2) is False
+    assert handled == [(20, 3), (20, 5)]
+    # The slow update holds the offset, the later ones are not queued twice
+    assert dispatcher.offset == 1
+    assert dispatcher.submit([update(2, 10), update(3, 20), update(7, 30)]) == 1
+
+    release.set()
+    assert dispatcher.wait_idle(timeout=5)
+    metrics = dispatcher.metrics()
+    dispatcher.shutdown()
+
+    assert [item for item in handled if item[0] == 10] == [(10, 1), (10, 2)]
+    assert (30, 7) in handled
+    assert dispatcher.offset == 8
+    assert (metrics['processed'], metrics['failed'], metrics['backlog'], metrics['active_chats']) == (7, 1, 0, 0)
@@ -0,0 +1,110 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from bot.models import OutboxMessage, TgUser
+from bot.outbox import OutboxSender, TokenBucket, enqueue
+from bot.tg.client import TgUncertainError
+
+
+class FakeClient:
+    def __init__(self, failing=(), error=ValueError('Bad Request')):
+        self.sent = []
+        self.failing = set(failing)
+        self.error = error
+
+    def send_message(self, chat_id, text, parse_mode=None):
+        if text in self.failing:
+            raise self.error
+        self.sent.append((chat_id, text))
+
+
+def make_sender(client, **kwargs):
+    options = {'rate': 1000, 'chat_rate': 1, 'chat_burst': 2, 'batch_size': 100, 'max_attempts': 2,
+               'retry_delay': 5, 'lease': 60} | kwargs
+    return OutboxSender(client, **options)
+
+
+def test_token_bucket():
+    """Testing the burst and the refill of the token bucket"""
+    bucket = TokenBucket(rate=2, capacity=2, now=0)
+    bucket.take(0)
+    bucket.take(0)
+    assert bucket.wait_time(0) == 0.5
+    assert bucket.wait_time(0.25) == 0.25
+    assert bucket.wait_time(10) == 0
+    assert bucket.tokens == 2
+
+
+@pytest.mark.django_db
+def test_outbox_chat_rate():
+    """Testing that a chat over its rate is put off with its later messages while other chats go on"""
+    for chat_id, text in ((1, 'a'), (1, 'b'), (2, 'c'), (1, 'd'), (1, 'e'), (2, 'f')):
+        enqueue(chat_id, text)
+    client = FakeClient()
+    sender = make_sender(client)
+
+    assert sender.send_pending() == 6
+    assert client.sent == [(1, 'a'), (1, 'b'), (2, 'c'), (2, 'f')]
+    put_off = OutboxMessage.objects.filter(status=OutboxMessage.Status.pending)
+    assert [message.text for message in put_off.order_by('id')] == ['d', 'e']
+    assert len({message.send_after for message in put_off}) == 1
+    assert sender.send_pending() == 0
+
+    put_off.update(send_after=timezone.now())
+    sender.chat_buckets.clear()
+    assert sender.send_pending() == 2
+    assert client.sent[-2:] == [(1, 'd'), (1, 'e')]
+    assert sender.sent == 6
+
+
+@pytest.mark.django_db
+def test_outbox_retries():
+    """Testing that a failed message holds the later ones of its chat until it is retried or given up"""
+    enqueue(1, 'broken')
+    enqueue(1, 'after')
+    client = FakeClient(failing={'broken'})
+    sender = make_sender(client, chat_burst=10)
+
+    sender.send_pending()
+    broken = OutboxMessage.objects.get(text='broken')
+    assert (broken.status, broken.attempts, broken.error) == (OutboxMessage.Status.pending, 1, 'Bad Request')
+    assert broken.send_after > timezone.now() + datetime.timedelta(seconds=4)
+    assert client.sent == []
+
+    OutboxMessage.objects.update(send_after=timezone.now())
+    sender.held.clear()
+    sender.send_pending()
+    assert OutboxMessage.objects.get(text='broken').status == OutboxMessage.Status.failed
+    assert client.sent == [(1, 'after')]
+    assert (sender.sent, sender.failed) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_outbox_no_retry_after_sent():
+    """Testing that a message telegram may have got is not sent again"""
+    enqueue(1, 'lost')
+    client = FakeClient(failing={'lost'}, error=TgUncertainError('sendMessage failed: read timeout'))
+    sender = make_sender(client)
+
+    sender.send_pending()
+    lost = OutboxMessage.objects.get(text='lost')
+    assert (lost.status, lost.attempts) == (OutboxMessage.Status.failed, 1)
+    assert sender.failed == 1
+
+
+@pytest.mark.django_db
+def test_verification_enqueues_message(client, create_login_user, monkeypatch):
+    """Testing that the verification only queues the message and run_outbox sends it"""
+    tg_client = FakeClient()
+    monkeypatch.setattr('bot.outbox.get_tg_client', lambda: tg_client)
+    TgUser.objects.create(tg_id=7, tg_chat_id=70, verification_code='code')
+
+    response = client.patch('/bot/verify', {'verification_code': 'code'}, content_type='application/json')
+    assert response.status_code == 200
+    assert tg_client.sent == []
+
+    call_command('run_outbox', once=True)
+    assert tg_client.sent == [(70, 'Вход прошел успешно!')]
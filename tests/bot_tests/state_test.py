@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from bot.management.commands.runbot import Command, States
+from bot.models import OutboxMessage, TgState, TgUser
+from core.models import User
+from bot.state import DbStateStore, MemoryStateStore
+from tests.bot_tests.dispatcher_test import update
+
+
+def test_memory_state_store(monkeypatch):
+    """Testing that the memory store keeps the recently used states until their ttl"""
+    now = [0.0]
+    monkeypatch.setattr('bot.state.time.monotonic', lambda: now[0])
+    store = MemoryStateStore(max_size=2, ttl=10)
+    store.set(1, 'idle')
+    store.set(2, 'idle')
+    store.get(1)
+    store.set(3, 'start', {'category': 5})
+
+    assert store.get(2) is None
+    assert store.get(3) == ('start', {'category': 5})
+    now[0] = 10
+    assert store.get(1) is None
+
+
+@pytest.mark.django_db
+def test_db_state_store(django_assert_num_queries):
+    """Testing that the database store buffers the changes, writes them in batches and reads the other's writes"""
+    store = DbStateStore(batch_size=3, flush_interval=60)
+    with django_assert_num_queries(1):
+        for tg_id in range(3):
+            store.set(tg_id, 'idle')
+    store.set(1, 'start', {'category': 7})
+
+    other = DbStateStore(batch_size=3, flush_interval=60)
+    assert other.get(1) == ('idle', {})
+    assert store.get(1) == ('start', {'category': 7})
+    store.flush()
+    assert other.get(1) == ('start', {'category': 7})
+
+    other.set(1, 'idle')
+    other.flush()
+    assert store.get(1) == ('idle', {})
+    assert store.get(5) is None
+    assert TgState.objects.count() == 3
+
+
+def test_db_state_store_flush_in_flight(monkeypatch):
+    """Testing that a state being written stays readable and that a later flush waits for the write"""
+    store = DbStateStore(batch_size=10, flush_interval=60)
+    writes, seen = [], []
+    later = threading.Thread(target=lambda: (store.set(1, 'idle'), store.flush()))
+
+    def bulk_create(objs, **kwargs):
+        if not writes:
+            seen.append(store.get(1))
+            later.start()
+            later.join(0.2)
+            seen.append(later.is_alive())
+        writes.append([(obj.tg_id, obj.state) for obj in objs])
+
+    monkeypatch.setattr(TgState.objects, 'bulk_create', bulk_create)
+    store.set(1, 'start', {'category': 7})
+    store.flush()
+    later.join()
+
+    assert seen == [('start', {'category': 7}), True]
+    assert writes == [[(1, 'start')], [(1, 'idle')]]
+
+
+@pytest.mark.django_db
+def test_bot_conversation_survives_restart(settings, create_category):
+    """Testing that a goal started with one bot process is finished with another one"""
+    settings.BOT_STATE_STORE = 'db'
+    TgUser.objects.create(tg_id=42, tg_chat_id=42, user=User.objects.get(username='archi'))
+
+    bot = Command()
+    bot.handle_message(update(1, 42, '/create').message)
+    bot.handle_message(update(2, 42, 'test category').message)
+    bot.states.flush()
+
+    restarted = Command()
+    restarted.handle_message(update(3, 42, 'goal from the bot').message)
+
+    assert restarted.get_state(42) == (States.idle, {})
+    assert OutboxMessage.objects.filter(chat_id=42).latest('id').text.startswith('Ваша цель создана')
@@ -0,0 +1,146 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.core.management import call_command
+
+from bot.dispatcher import UpdateDispatcher
+from bot.inbox import WebhookInbox
+from bot.management.commands.runbot import Command
+from bot.models import TgUpdate
+
+SECRET = 'webhook-secret'
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Bot API methods used by the bot, every call is recorded by the server"""
+    def do_POST(self):
+        method = self.path.rsplit('/', 1)[-1]
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or 'null')
+        self.server.calls.append((method, body))
+        if method == 'sendMessage':
+            result = {'message_id': len(self.server.calls), 'chat': {'id': body['chat_id'], 'type': 'private'},
+                      'from': {'id': 1, 'first_name': 'bot', 'last_name': None, 'username': None},
+                      'text': body['text']}
+        else:
+            result = True
+        content = json.dumps({'ok': True, 'result': result}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_telegram(settings, monkeypatch):
+    """Local Telegram server the shared client talks to"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTelegramHandler)
+    server.calls = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.TG_API_URL = f'http://127.0.0.1:{server.server_port}'
+    monkeypatch.setattr('bot.tg.client._client', None)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post_update(client, data, secret=SECRET):
+    return client.post('/bot/webhook', data, content_type='application/json',
+                       headers={'X-Telegram-Bot-Api-Secret-Token': secret})
+
+
+def as_data(update_id, chat_id, text):
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'chat': {'id': chat_id, 'type': 'private'}, 'text': text,
+        'from': {'id': chat_id, 'first_name': 'user', 'last_name': None, 'username': 'user'},
+    }}
+
+
+@pytest.mark.django_db
+def test_webhook_secret(client, settings):
+    """Testing that the webhook is off without a secret and takes only the calls with it"""
+    settings.BOT_WEBHOOK_SECRET = None
+    assert post_update(client, as_data(1, 5, 'hi')).status_code == 404
+
+    settings.BOT_WEBHOOK_SECRET = SECRET
+    assert post_update(client, as_data(1, 5, 'hi'), secret='wrong').status_code == 403
+    assert post_update(client, {'message': {}}).status_code == 400
+    assert post_update(client, as_data(1, 5, 'hi')).status_code == 200
+    assert TgUpdate.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_webhook_inbox(client, settings):
+    """Testing that the updates delivered again are dropped and only the finished ones are marked handled"""
+    settings.BOT_WEBHOOK_SECRET = SECRET
+    for update_id in (10, 11, 10):
+        assert post_update(client, as_data(update_id, 5, 'hi')).status_code == 200
+    inbox = WebhookInbox(poll_interval=0.01, keep_seconds=60)
+
+    assert [item.update_id for item in inbox.get_updates(timeout=0).result] == [10, 11]
+    assert inbox.get_updates(timeout=0).result == []
+    inbox.finish(11)
+    assert inbox.get_updates(timeout=0).result == []
+    assert list(TgUpdate.objects.filter(handled=True).values_list('update_id', flat=True)) == [11]
+
+    # A restarted bot gets the unfinished updates again
+    assert [item.update_id for item in WebhookInbox(0.01, 60).get_updates(timeout=0).result] == [10]
+
+    post_update(client, as_data(11, 5, 'hi'))
+    inbox.finish(10)
+    assert inbox.get_updates(timeout=0).result == []
+    assert TgUpdate.objects.filter(handled=True).count() == 2
+
+    inbox.keep_seconds = 0
+    inbox.prune()
+    assert not TgUpdate.objects.exists()
+
+
+@pytest.mark.django_db
+def test_webhook_updates_out_of_order(client, settings):
+    """Testing that an update committed after a later one finished is still handled"""
+    settings.BOT_WEBHOOK_SECRET = SECRET
+    inbox = WebhookInbox(poll_interval=0.01, keep_seconds=60)
+    handled = []
+    dispatcher = UpdateDispatcher(lambda message: handled.append(message.message_id), workers=2, ordered=False,
+                                  on_done=inbox.finish)
+
+    post_update(client, as_data(11, 5, 'hi'))
+    dispatcher.submit(inbox.get_updates(timeout=0).result)
+    assert dispatcher.wait_idle(timeout=5)
+    post_update(client, as_data(10, 6, 'hi'))
+    dispatcher.submit(inbox.get_updates(timeout=0).result)
+    assert dispatcher.wait_idle(timeout=5)
+    inbox.get_updates(timeout=0)
+    dispatcher.shutdown()
+
+    assert handled == [11, 10]
+    assert TgUpdate.objects.filter(handled=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_webhook_mode(client, settings, fake_telegram):
+    """Testing the webhook mode of the bot against a local Telegram server"""
+    settings.BOT_WEBHOOK_URL = 'https://todolist.example/bot/webhook'
+    settings.BOT_WEBHOOK_SECRET = SECRET
+    bot = Command()
+    inbox = bot.get_update_source(webhook=True)
+    assert fake_telegram.calls[-1] == ('setWebhook', {
+        'url': 'https://todolist.example/bot/webhook', 'secret_token': SECRET, 'max_connections': 40,
+        'allowed_updates': ['message'],
+    })
+
+    post_update(client, as_data(1, 42, '/start'))
+    for item in inbox.get_updates(0, timeout=0).result:
+        bot.handle_message(item.message)
+    call_command('run_outbox', once=True)
+    assert fake_telegram.calls[-1] == ('sendMessage', {'chat_id': 42, 'text': 'Привет!'})
+
+    assert bot.get_update_source(webhook=False) is bot.tg_client
+    assert fake_telegram.calls[-1] == ('deleteWebhook', None)
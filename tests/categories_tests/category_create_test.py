@@ -26,6 +26,10 @@ def test_category_create(client, create_login_user):
         "updated": create_category.data["updated"],
         "title": "test category",
         "is_deleted": False,
+        "to_do_count": 0,
+        "in_progress_count": 0,
+        "done_count": 0,
+        "archived_count": 0,
         "board": board_create.data["id"]
     }
 
@@ -29,6 +29,10 @@ def test_category_update(client, create_login_user):
         "updated": update_category_response.data["updated"],
         "title": "test category 2",
         "is_deleted": False,
+        "to_do_count": 0,
+        "in_progress_count": 0,
+        "done_count": 0,
+        "archived_count": 0,
         "board": board_create.data["id"]
     }
 
@@ -29,6 +29,10 @@ def test_list_category(client, create_login_user):
             "updated": create_category_1.data['updated'],
             "title": 'test category 1',
             "is_deleted": False,
+            "to_do_count": 0,
+            "in_progress_count": 0,
+            "done_count": 0,
+            "archived_count": 0,
             "board": board_create.data['id']
         },
         {
@@ -38,6 +42,10 @@ def test_list_category(client, create_login_user):
             "updated": create_category_2.data['updated'],
             "title": 'test category 2',
             "is_deleted": False,
+            "to_do_count": 0,
+            "in_progress_count": 0,
+            "done_count": 0,
+            "archived_count": 0,
             "board": board_create.data['id']
         }]
 
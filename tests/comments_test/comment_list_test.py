@@ -0,0 +1,30 @@
+import datetime
+
+import pytest
+from django.utils import timezone
+
+from core.models import User
+from goals.models import Goal, GoalComment
+
+
+@pytest.mark.django_db
+def test_comment_list_pages(client, create_goal):
+    """Testing that the comments of a goal are listed newest first page by page"""
+    goal = Goal.objects.get(pk=create_goal.data['id'])
+    now = timezone.now()
+    comments = GoalComment.objects.bulk_create([
+        GoalComment(text=f'comment {number}', goal=goal, board_id=goal.board_id, user=User.objects.get())
+        for number in range(5)
+    ])
+    # Two comments share the creation time, the id breaks the tie
+    for comment, created in zip(comments, (0, 1, 1, 2, 3)):
+        GoalComment.objects.filter(pk=comment.pk).update(created=now + datetime.timedelta(seconds=created))
+
+    first = client.get(f'/goals/goal_comment/list?goal={goal.id}&limit=2')
+    second = client.get(first.data['next'])
+    last = client.get(second.data['next'])
+
+    assert [item['text'] for item in first.data['results']] == ['comment 4', 'comment 3']
+    assert [item['text'] for item in second.data['results']] == ['comment 2', 'comment 1']
+    assert [item['text'] for item in last.data['results']] == ['comment 0']
+    assert last.data['next'] is None
@@ -1,9 +1,22 @@
+import pytest
+from django.core.cache import cache
 from pytest_factoryboy import register
 
+from goals.membership import membership_cache
 from tests.factories import BoardFactory, CategoryFactory, UserFactory
 
 pytest_plugins = 'tests.fixtures'
 
 register(BoardFactory)
 register(CategoryFactory)
-register(UserFactory)
\ No newline at end of file
+register(UserFactory)
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Process-wide caches outlive the rolled back test transactions"""
+    membership_cache.clear()
+    cache.clear()
+    yield
+    membership_cache.clear()
+    cache.clear()
@@ -1,7 +1,7 @@
 import factory.django
 from factory import Faker
 from core.models import User
-from goals.models import Board, GoalCategory
+from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment
 
 
 class UserFactory(factory.django.DjangoModelFactory):
@@ -22,6 +22,15 @@ class BoardFactory(factory.django.DjangoModelFactory):
     title = Faker('test')
 
 
+class ParticipantFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = BoardParticipant
+
+    board = factory.SubFactory(BoardFactory)
+    user = factory.SubFactory(UserFactory)
+    role = BoardParticipant.Role.owner
+
+
 class CategoryFactory(factory.django.DjangoModelFactory):
     class Meta:
         model = GoalCategory
@@ -29,3 +38,24 @@ class CategoryFactory(factory.django.DjangoModelFactory):
     title = Faker('test')
     board = factory.SubFactory(BoardFactory)
     user = factory.SubFactory(UserFactory)
+
+
+class GoalFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = Goal
+
+    title = Faker('sentence', nb_words=4)
+    description = Faker('text', max_nb_chars=200)
+    category = factory.SubFactory(CategoryFactory)
+    board = factory.SelfAttribute('category.board')
+    user = factory.SelfAttribute('category.user')
+
+
+class CommentFactory(factory.django.DjangoModelFactory):
+    class Meta:
+        model = GoalComment
+
+    text = Faker('text', max_nb_chars=200)
+    goal = factory.SubFactory(GoalFactory)
+    board = factory.SelfAttribute('goal.board')
+    user = factory.SelfAttribute('goal.user')
@@ -0,0 +1,78 @@
+import pytest
+from django.test import Client
+
+from goals.models import Board, Goal
+
+
+@pytest.mark.django_db
+def test_goals_batch(client, django_assert_max_num_queries, create_goal):
+    """Testing create/update/archive operations of the goal batch"""
+    category_id = create_goal.data['category']
+    operations = [{'op': 'create', 'title': f'goal {i}', 'category': category_id, 'priority': 3} for i in range(50)]
+    operations += [
+        {'op': 'update', 'id': create_goal.data['id'], 'title': 'updated goal', 'status': 2},
+        {'op': 'archive', 'id': create_goal.data['id']},
+        {'op': 'create', 'category': category_id},
+        {'op': 'update', 'id': 0, 'title': 'missing goal'},
+        {'op': 'create', 'title': 'missing category', 'category': 0},
+    ]
+
+    # session, user, goals, categories, roles, savepoint, insert, locked goals, update, counters, board versions
+    with django_assert_max_num_queries(13):
+        batch_response = client.post('/goals/goal/batch', {'operations': operations},
+                                     content_type='application/json')
+
+    results = batch_response.data['results']
+    goal = Goal.objects.get(pk=create_goal.data['id'])
+
+    assert batch_response.status_code == 200
+    assert all(result['ok'] for result in results[:52])
+    assert Goal.objects.filter(pk__in=[result['id'] for result in results[:50]], priority=3).count() == 50
+    assert (goal.title, goal.status) == ('updated goal', Goal.Status.archived)
+    assert goal.updated > goal.created
+    assert results[52]['errors'] == {'title': ['This field is required.']}
+    assert results[53]['errors'] == {'id': ['Goal not found']}
+    assert results[54]['errors'] == {'category': ['Category not found']}
+
+
+@pytest.mark.django_db
+def test_goals_batch_permission(client, create_goal, create_another_user):
+    """Testing that the batch checks the board role of the user"""
+    client.put(f'/goals/board/{Goal.objects.get(pk=create_goal.data["id"]).board_id}',
+               {'title': 'test board', 'participants': [{'role': 3, 'user': 'archi1'}]},
+               content_type='application/json')
+    client.login(username='archi1', password='developer789!1')
+    batch_response = client.post('/goals/goal/batch',
+                                 {'operations': [{'op': 'archive', 'id': create_goal.data['id']},
+                                                 {'op': 'create', 'title': 'goal',
+                                                  'category': create_goal.data['category']}]},
+                                 content_type='application/json')
+
+    assert batch_response.status_code == 200
+    assert [result['ok'] for result in batch_response.data['results']] == [False, False]
+    assert batch_response.data['results'][1]['errors'] == {
+        'category': ['You do not have permission to perform this action.']
+    }
+    assert Goal.objects.get(pk=create_goal.data['id']).status == Goal.Status.to_do
+
+
+@pytest.mark.django_db
+def test_goals_batch_foreign_category(client, create_goal, create_another_user):
+    """Testing that the batch does not move a goal to a board the user does not participate in"""
+    other = Client()
+    other.login(username='archi1', password='developer789!1')
+    board = other.post('/goals/board/create', {'title': 'other board'}, content_type='application/json')
+    category = other.post('/goals/goal_category/create', {'title': 'other category', 'board': board.data['id']},
+                          content_type='application/json')
+
+    batch_response = client.post('/goals/goal/batch', {'operations': [
+        {'op': 'archive', 'id': create_goal.data['id'], 'category': category.data['id']},
+        {'op': 'update', 'id': create_goal.data['id'], 'category': category.data['id']},
+    ]}, content_type='application/json')
+
+    results = batch_response.data['results']
+    assert results[0]['errors'] == {'category': ['An archived goal keeps its category.']}
+    assert results[1]['errors'] == {'category': ['Category not found']}
+    goal = Goal.objects.get(pk=create_goal.data['id'])
+    assert (goal.status, goal.category_id) == (Goal.Status.to_do, create_goal.data['category'])
+    assert Board.objects.get(pk=board.data['id']).archived_count == 0
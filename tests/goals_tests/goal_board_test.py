@@ -0,0 +1,29 @@
+import pytest
+
+from goals.models import Goal, GoalComment
+
+
+@pytest.mark.django_db
+def test_goal_board_follows_category(client, create_goal):
+    """Testing that the denormalized board of a goal and its comments follows the category"""
+    create_comment = client.post('/goals/goal_comment/create',
+                                 {'text': 'new comment', 'goal': create_goal.data['id']},
+                                 content_type='application/json')
+    board_create = client.post('/goals/board/create', {'title': 'second board'},
+                               content_type='application/json')
+    category_create = client.post('/goals/goal_category/create',
+                                  {'title': 'second category', 'board': board_create.data['id']},
+                                  format='json')
+
+    goal = Goal.objects.get(pk=create_goal.data['id'])
+    assert goal.board_id == goal.category.board_id
+    assert GoalComment.objects.get(pk=create_comment.data['id']).board_id == goal.board_id
+
+    move_response = client.patch(f'/goals/goal/{goal.id}',
+                                 {'category': category_create.data['id']},
+                                 content_type='application/json')
+
+    assert move_response.status_code == 200
+    assert Goal.objects.get(pk=goal.id).board_id == board_create.data['id']
+    assert GoalComment.objects.get(pk=create_comment.data['id']).board_id == board_create.data['id']
+    assert client.get(f'/goals/goal_comment/{create_comment.data["id"]}').status_code == 200
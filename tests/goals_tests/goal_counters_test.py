@@ -0,0 +1,82 @@
+import pytest
+from django.core.management import call_command
+
+from goals.models import Board, Goal, GoalCategory
+
+
+def counts(obj):
+    obj.refresh_from_db()
+    return obj.to_do_count, obj.in_progress_count, obj.done_count, obj.archived_count
+
+
+@pytest.mark.django_db
+def test_goal_counters(client, create_goal):
+    """Testing that the counters follow goal and comment writes, the bulk ones included"""
+    goal_id, category_id = create_goal.data['id'], create_goal.data['category']
+    category = GoalCategory.objects.get(pk=category_id)
+    board = category.board
+    other_board = client.post('/goals/board/create', {'title': 'other board'}, content_type='application/json')
+    other_category = GoalCategory.objects.get(pk=client.post(
+        '/goals/goal_category/create', {'title': 'other', 'board': other_board.data['id']},
+        content_type='application/json'
+    ).data['id'])
+    assert counts(category) == counts(board) == (1, 0, 0, 0)
+
+    client.patch(f'/goals/goal/{goal_id}', {'status': Goal.Status.done}, content_type='application/json')
+    comment = client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': goal_id},
+                          content_type='application/json')
+    client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': goal_id}, content_type='application/json')
+    client.delete(f'/goals/goal_comment/{comment.data["id"]}')
+    assert counts(category) == counts(board) == (0, 0, 1, 0)
+    assert client.get(f'/goals/goal/{goal_id}').data['comment_count'] == 1
+
+    client.post('/goals/goal/batch', {'operations': [
+        {'op': 'create', 'title': 'batch goal', 'category': category_id},
+        {'op': 'update', 'id': goal_id, 'category': other_category.id, 'status': Goal.Status.in_progress},
+    ]}, content_type='application/json')
+    imported = client.post('/goals/goal/import', f'{{"title": "imported", "category": {category_id}}}\n',
+                           content_type='application/x-ndjson')
+    b''.join(imported.streaming_content)
+    assert counts(category) == counts(board) == (2, 0, 0, 0)
+    other_board = Board.objects.get(pk=other_board.data['id'])
+    assert counts(other_category) == counts(other_board) == (0, 1, 0, 0)
+
+    client.delete(f'/goals/goal/{goal_id}')
+    client.delete(f'/goals/goal_category/{category_id}')
+    call_command('run_archive_jobs', once=True)
+    assert counts(category) == counts(board) == (0, 0, 0, 2)
+    assert counts(other_category) == counts(other_board) == (0, 0, 0, 1)
+    assert [item['archived_count'] for item in client.get('/goals/board/list').data] == [1, 2]
+
+
+@pytest.mark.django_db
+def test_recount_counters(client, create_goal):
+    """Testing that the repair command recomputes the broken counters"""
+    client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': create_goal.data['id']},
+                content_type='application/json')
+    Goal.objects.update(comment_count=5)
+    GoalCategory.objects.update(to_do_count=0, done_count=3)
+    Board.objects.update(archived_count=-1)
+
+    call_command('recount_counters', batch_size=1)
+
+    category = GoalCategory.objects.get(pk=create_goal.data['category'])
+    assert Goal.objects.get().comment_count == 1
+    assert counts(category) == counts(category.board) == (1, 0, 0, 0)
+
+
+@pytest.mark.django_db
+def test_goal_counters_stale_instances(create_goal):
+    """Testing that writes through stale copies of a goal count from the row, not from the copy"""
+    first, second, third = (Goal.objects.get(pk=create_goal.data['id']) for _ in range(3))
+    category = GoalCategory.objects.get(pk=create_goal.data['category'])
+
+    first.status = Goal.Status.done
+    first.save(update_fields=('status', 'updated'))
+    second.status = Goal.Status.done
+    second.save(update_fields=('status', 'updated'))
+    assert counts(category) == counts(category.board) == (0, 0, 1, 0)
+
+    first.delete()
+    third.delete()
+    assert counts(category) == counts(category.board) == (0, 0, 0, 0)
@@ -20,6 +20,7 @@ def test_create_goal(client, create_category):
         "status": create_goal.data['status'],
         "priority": create_goal.data['priority'],
         "due_date": create_goal.data['due_date'],
+        "comment_count": 0,
         "user": goal_response.data['user']
     }
 
@@ -0,0 +1,62 @@
+import pytest
+
+from goals.pagination import parse_positive_int
+
+
+def collect_pages(client, url):
+    """Walks through all pages of the cursor pagination"""
+    ids, pages = [], 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [goal['id'] for goal in response.data['results']]
+        url = response.data['next']
+        pages += 1
+    return ids, pages
+
+
+@pytest.mark.django_db
+def test_goals_cursor_list(client, create_category):
+    """Testing the cursor pagination of the goal list for every ordering"""
+    goals = []
+    for priority, due_date in [(2, '2023-08-01'), (1, None), (2, None), (1, '2023-07-01'),
+                               (2, '2023-08-01'), (3, '2023-06-01'), (1, '2023-07-01')]:
+        response = client.post('/goals/goal/create',
+                               {'title': 'goal', 'category': create_category.data['id'],
+                                'priority': priority, 'due_date': due_date},
+                               content_type='application/json')
+        assert response.status_code == 201
+        goals.append(response.data)
+
+    by_priority = sorted(goals, key=lambda g: (g['priority'], g['due_date'] is None, g['due_date'] or '', g['id']))
+    ids, pages = collect_pages(client, '/goals/goal/list?cursor=&limit=2')
+    assert ids == [goal['id'] for goal in by_priority]
+    assert pages == 4
+
+    by_due_date = sorted(goals, key=lambda g: g['id'])
+    by_due_date = sorted(by_due_date, key=lambda g: g['due_date'] or '9999', reverse=True)
+    ids, _ = collect_pages(client, '/goals/goal/list?cursor=&limit=3&ordering=-due_date')
+    assert [goal['id'] for goal in by_due_date] == ids
+
+    filtered_ids, _ = collect_pages(client, '/goals/goal/list?cursor=&limit=1&priority=1&search=goal')
+    assert filtered_ids == [goal['id'] for goal in by_priority if goal['priority'] == 1]
+
+
+@pytest.mark.django_db
+def test_goals_invalid_cursor(client, create_category):
+    """Testing the response to a broken cursor"""
+    response = client.get('/goals/goal/list?cursor=broken')
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('value', ['0', '-3', 'ten', ''])
+def test_parse_positive_int_rejects(value):
+    with pytest.raises(ValueError):
+        parse_positive_int(value, cutoff=10)
+
+
+def test_parse_positive_int():
+    assert parse_positive_int('7', cutoff=10) == 7
+    assert parse_positive_int('70', cutoff=10) == 10
+    assert parse_positive_int('70') == 70
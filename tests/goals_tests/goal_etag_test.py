@@ -0,0 +1,21 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_goal_and_comment_list_etag(client, create_goal):
+    """Testing the conditional GET of the goal and comment lists"""
+    comments_url = f'/goals/goal_comment/list?goal={create_goal.data["id"]}'
+    goals_etag = client.get('/goals/goal/list')['ETag']
+    comments_etag = client.get(comments_url)['ETag']
+
+    assert client.get('/goals/goal/list', HTTP_IF_NONE_MATCH=goals_etag).status_code == 304
+    assert client.get(comments_url, HTTP_IF_NONE_MATCH=f'"other", {comments_etag}').status_code == 304
+    assert client.get('/goals/goal/list?limit=1', HTTP_IF_NONE_MATCH=goals_etag).status_code == 200
+
+    client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': create_goal.data['id']},
+                content_type='application/json')
+
+    assert client.get('/goals/goal/list', HTTP_IF_NONE_MATCH=goals_etag).status_code == 200
+    response = client.get(comments_url, HTTP_IF_NONE_MATCH=comments_etag)
+    assert response.status_code == 200
+    assert [comment['text'] for comment in response.data['results']] == ['comment']
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from goals.models import Goal, GoalCategory
+
+
+def post_import(client, body, query='', content_type='application/x-ndjson'):
+    response = client.post(f'/goals/goal/import{query}', body, content_type=content_type)
+    assert response.status_code == 200
+    return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+
+@pytest.mark.django_db
+def test_goal_import(client, create_category, create_another_user):
+    """Testing the chunked import of goals with the progress and the errors of every row"""
+    category = create_category.data['id']
+    foreign_category = GoalCategory.objects.create(
+        title='foreign', board_id=client.post('/goals/board/create', {'title': 'b'}).data['id'],
+        user_id=create_another_user.data['id'],
+    )
+    client.put(f'/goals/board/{foreign_category.board_id}', {'title': 'b', 'participants': [
+        {'role': 3, 'user': 'archi1'}]}, content_type='application/json')
+    rows = [
+        json.dumps({'title': 'first', 'category': category, 'priority': 3, 'due_date': '2023-08-01'}),
+        '{broken',
+        json.dumps({'category': category}),
+        json.dumps({'title': 'unknown category', 'category': 100500}),
+        json.dumps({'title': 'by stranger', 'category': category, 'user': 'archi1'}),
+        json.dumps({'title': 'by participant', 'category': foreign_category.id, 'user': 'archi1'}),
+    ]
+
+    progress = post_import(client, '\n'.join(rows), '?chunk_size=4')
+
+    assert [(chunk['rows'], chunk['created']) for chunk in progress[:-1]] == [(4, 1), (6, 2)]
+    assert progress[-1] == {'done': True, 'rows': 6, 'created': 2, 'failed': 4}
+    assert [(error['row'], list(error['errors'])) for chunk in progress[:-1] for error in chunk['errors']] == [
+        (2, ['non_field_errors']), (3, ['title']), (4, ['category']), (5, ['user'])
+    ]
+    goals = Goal.objects.order_by('id')
+    assert [(goal.title, goal.user.username, goal.board_id) for goal in goals] == [
+        ('first', 'archi', create_category.data['board']), ('by participant', 'archi1', foreign_category.board_id)
+    ]
+    assert {goal['title'] for goal in client.get('/goals/goal/list').data} == {'first', 'by participant'}
+
+
+@pytest.mark.django_db
+def test_goal_import_queries_per_chunk(client, create_category):
+    """Testing that a chunk costs the same number of queries whatever its size"""
+    def count_queries(size):
+        body = '\n'.join(json.dumps({'title': 'goal', 'category': create_category.data['id'], 'user': 'archi'})
+                         for _ in range(size))
+        with CaptureQueriesContext(connection) as context:
+            post_import(client, body)
+        return len(context.captured_queries)
+
+    assert count_queries(5) == count_queries(50)
+
+
+@pytest.mark.django_db
+def test_goal_import_content_type(client, create_category):
+    """Testing that only the body type of the import is accepted, a form body is refused before it is read"""
+    body = json.dumps({'title': 'first', 'category': create_category.data['id']})
+    form = client.post('/goals/goal/import', body, content_type='application/x-www-form-urlencoded')
+    csv = client.post('/goals/goal/import?type=csv', body, content_type='application/x-ndjson')
+    assert form.status_code == csv.status_code == 415
+
+    progress = post_import(client, f'title,category\nfrom csv,{create_category.data["id"]}\n', '?type=csv',
+                           content_type='text/csv; charset=utf-8')
+    assert progress[-1] == {'done': True, 'rows': 1, 'created': 1, 'failed': 0}
+
+
+@pytest.mark.django_db
+def test_import_goals_command(tmp_path, capsys, create_category):
+    """Testing the import of a CSV file by the management command"""
+    path = tmp_path / 'goals.csv'
+    path.write_text(f'title,category,status,description\n'
+                    f'first,{create_category.data["id"]},2,\n'
+                    f'second,{create_category.data["id"]},9,text\n')
+
+    call_command('import_goals', str(path), user='archi')
+
+    output = capsys.readouterr()
+    assert list(Goal.objects.values_list('title', 'status', 'description')) == [('first', 2, None)]
+    assert 'row 3: {"status"' in output.err
+    assert 'Done: 1 of 2 rows imported' in output.out
+
+
+@pytest.mark.django_db
+def test_import_goals_command_checks_author(tmp_path, capsys, create_category, create_another_user):
+    """Testing that the author of the command must write to the board of the rows"""
+    path = tmp_path / 'goals.ndjson'
+    path.write_text(json.dumps({'title': 'first', 'category': create_category.data['id']}) + '\n')
+
+    call_command('import_goals', str(path), user='archi1')
+
+    output = capsys.readouterr()
+    assert not Goal.objects.exists()
+    assert 'row 1: {"category"' in output.err
@@ -0,0 +1,17 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_explain_goal_queries(client, create_goal):
+    """Testing the EXPLAIN check of the list queries"""
+    out = StringIO()
+    call_command('explain_goal_queries', 'archi', stdout=out)
+    output = out.getvalue()
+
+    assert '-- goal list:' in output
+    assert '-- goal list by category:' in output
+    assert 'goal_category_status_idx' in output
+    assert 'category_active_title_idx' in output
@@ -0,0 +1,59 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from goals.models import Goal
+
+
+def get_list(client, url):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return response.data, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_goal_list_cached(client, create_goal):
+    """Testing that an unchanged board is served from the cache and every write makes the list fresh"""
+    _, first_queries = get_list(client, '/goals/goal/list')
+    goals, cached_queries = get_list(client, '/goals/goal/list')
+    assert cached_queries < first_queries
+    assert [goal['title'] for goal in goals] == ['new goal']
+
+    client.patch(f'/goals/goal/{create_goal.data["id"]}', {'title': 'renamed goal'},
+                 content_type='application/json')
+    goals, _ = get_list(client, '/goals/goal/list')
+    assert [goal['title'] for goal in goals] == ['renamed goal']
+
+    client.post('/goals/goal/batch', {'operations': [{'op': 'archive', 'id': create_goal.data['id']}]},
+                content_type='application/json')
+    goals, _ = get_list(client, '/goals/goal/list')
+    assert [goal['status'] for goal in goals] == [Goal.Status.archived]
+
+    Goal.objects.filter(pk=create_goal.data['id']).update(status=Goal.Status.to_do)
+    client.delete(f'/goals/goal_category/{create_goal.data["category"]}')
+    call_command('run_archive_jobs', once=True)
+    goals, _ = get_list(client, '/goals/goal/list')
+    assert [goal['status'] for goal in goals] == [Goal.Status.archived]
+
+
+@pytest.mark.django_db
+def test_category_list_cache_follows_participants(client, create_category, create_another_user):
+    """Testing that a new participant does not get the cached list of the board"""
+    other = Client()
+    other.login(username='archi1', password='developer789!1')
+    categories, _ = get_list(other, '/goals/goal_category/list')
+    assert categories == []
+
+    client.put(f'/goals/board/{create_category.data["board"]}',
+               {'title': 'test board', 'participants': [{'role': 3, 'user': 'archi1'}]},
+               content_type='application/json')
+    categories, _ = get_list(other, '/goals/goal_category/list')
+    assert [category['id'] for category in categories] == [create_category.data['id']]
+
+    client.patch(f'/goals/goal_category/{create_category.data["id"]}', {'title': 'renamed category'},
+                 content_type='application/json')
+    categories, _ = get_list(other, '/goals/goal_category/list')
+    assert [category['title'] for category in categories] == ['renamed category']
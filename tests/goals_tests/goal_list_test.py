@@ -25,6 +25,7 @@ def test_goals_list(client, create_category):
             "status": create_goal_1.data['status'],
             "priority": create_goal_1.data['priority'],
             "due_date": create_goal_1.data['due_date'],
+            "comment_count": 0,
             "user": goal_list_response.data[0]['user'],
         },
         {
@@ -37,6 +38,7 @@ def test_goals_list(client, create_category):
             "status": create_goal_2.data['status'],
             "priority": create_goal_2.data['priority'],
             "due_date": create_goal_2.data['due_date'],
+            "comment_count": 0,
             "user": goal_list_response.data[1]['user']
         }
     ]
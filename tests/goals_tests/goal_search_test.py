@@ -0,0 +1,27 @@
+import pytest
+
+
+@pytest.mark.django_db
+def test_goals_search(client, create_category):
+    """Testing the prefix search over the title and the description of goals"""
+    create_goal_1 = client.post('/goals/goal/create',
+                                {'title': 'Buy milk', 'description': 'weekly groceries',
+                                 'category': create_category.data['id']},
+                                content_type='application/json')
+    create_goal_2 = client.post('/goals/goal/create',
+                                {'title': 'Read a book', 'description': 'about milk',
+                                 'category': create_category.data['id']},
+                                content_type='application/json')
+
+    description_response = client.get('/goals/goal/list?search=groc')
+    title_response = client.get('/goals/goal/list?search=Boo')
+    both_response = client.get('/goals/goal/list?search=milk')
+    category_response = client.get('/goals/goal_category/list?search=test cat')
+    empty_category_response = client.get('/goals/goal_category/list?search=missing')
+
+    assert [goal['id'] for goal in description_response.data] == [create_goal_1.data['id']]
+    assert [goal['id'] for goal in title_response.data] == [create_goal_2.data['id']]
+    assert {goal['id'] for goal in both_response.data} == {create_goal_1.data['id'], create_goal_2.data['id']}
+    assert 'search_vector' not in both_response.data[0]
+    assert [category['id'] for category in category_response.data] == [create_category.data['id']]
+    assert empty_category_response.data == []
@@ -0,0 +1,122 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.test import Client
+from django.utils import timezone
+
+from goals.models import Tombstone
+from goals.sync import SyncPosition, encode_cursor
+
+
+@pytest.fixture(autouse=True)
+def no_overlap(settings):
+    settings.SYNC_OVERLAP_SECONDS = 0
+
+
+def sync(client, cursor=''):
+    response = client.get(f'/goals/sync?cursor={cursor}')
+    assert response.status_code == 200
+    return response.data
+
+
+@pytest.mark.django_db
+def test_sync(client, create_goal):
+    """Testing that the delta sync returns the changed objects and the removed ones once"""
+    comment = client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': create_goal.data['id']},
+                          content_type='application/json')
+    first = sync(client)
+    assert [goal['id'] for goal in first['goals']] == [create_goal.data['id']]
+    assert [category['id'] for category in first['categories']] == [create_goal.data['category']]
+    assert [item['id'] for item in first['comments']] == [comment.data['id']]
+    assert len(first['boards']) == 1
+
+    unchanged = sync(client, first['cursor'])
+    assert unchanged['boards'] == unchanged['categories'] == unchanged['goals'] == unchanged['comments'] == []
+    assert unchanged['deleted'] == {'boards': [], 'categories': [], 'goals': [], 'comments': []}
+
+    client.patch(f'/goals/goal/{create_goal.data["id"]}', {'title': 'renamed goal'},
+                 content_type='application/json')
+    client.delete(f'/goals/goal_comment/{comment.data["id"]}')
+    changed = sync(client, unchanged['cursor'])
+    assert [goal['title'] for goal in changed['goals']] == ['renamed goal']
+    assert changed['deleted']['comments'] == [comment.data['id']]
+
+    client.delete(f'/goals/board/{first["boards"][0]["id"]}')
+    call_command('run_archive_jobs', once=True)
+    deleted = sync(client, changed['cursor'])
+    assert deleted['goals'] == deleted['categories'] == deleted['boards'] == []
+    assert deleted['deleted'] == {'boards': [first['boards'][0]['id']], 'categories': [create_goal.data['category']],
+                                  'goals': [create_goal.data['id']], 'comments': []}
+
+
+@pytest.mark.django_db
+def test_sync_of_participant(client, create_goal, create_another_user):
+    """Testing that a new participant gets the whole board and a removed one gets its tombstone"""
+    board_id = client.get('/goals/board/list').data[0]['id']
+    other = Client()
+    other.login(username='archi1', password='developer789!1')
+    cursor = sync(other)['cursor']
+
+    client.put(f'/goals/board/{board_id}', {'title': 'test board', 'participants': [{'role': 3, 'user': 'archi1'}]},
+               content_type='application/json')
+    joined = sync(other, cursor)
+    assert [goal['id'] for goal in joined['goals']] == [create_goal.data['id']]
+    assert [board['id'] for board in joined['boards']] == [board_id]
+
+    client.put(f'/goals/board/{board_id}', {'title': 'test board', 'participants': []},
+               content_type='application/json')
+    removed = sync(other, joined['cursor'])
+    assert removed['goals'] == []
+    assert removed['deleted']['boards'] == [board_id]
+
+
+@pytest.mark.django_db
+def test_sync_invalid_cursor(client, create_login_user):
+    """Testing the response to a broken cursor"""
+    assert client.get('/goals/sync?cursor=broken').status_code == 404
+
+
+@pytest.mark.django_db
+def test_sync_pages(client, settings, create_goal):
+    """Testing that a sync goes page by page through the objects and the next sync starts after it"""
+    settings.SYNC_PAGE_SIZE = 2
+    comments = [
+        client.post('/goals/goal_comment/create', {'text': f'comment {number}', 'goal': create_goal.data['id']},
+                    content_type='application/json').data['id']
+        for number in range(3)
+    ]
+    pages = [sync(client)]
+    while pages[-1]['has_more']:
+        pages.append(sync(client, pages[-1]['cursor']))
+
+    assert [len(page['boards'] + page['categories'] + page['goals'] + page['comments']) for page in pages] == \
+        [2, 2, 2, 0]
+    assert [item['id'] for page in pages for item in page['comments']] == comments
+    assert [goal['id'] for page in pages for goal in page['goals']] == [create_goal.data['id']]
+
+    client.delete(f'/goals/goal_comment/{comments[0]}')
+    changed = sync(client, pages[-1]['cursor'])
+    assert changed['has_more'] is False
+    assert changed['comments'] == []
+    assert changed['deleted']['comments'] == [comments[0]]
+
+
+@pytest.mark.django_db
+def test_sync_resync_after_retention(client, settings, create_goal):
+    """Testing that a cursor older than the tombstone retention gets a full resync"""
+    settings.SYNC_TOMBSTONE_RETENTION_DAYS = 30
+    comment = client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': create_goal.data['id']},
+                          content_type='application/json')
+    client.delete(f'/goals/goal_comment/{comment.data["id"]}')
+    month_ago = timezone.now() - datetime.timedelta(days=31)
+    assert sync(client, encode_cursor(SyncPosition(since=None, snapshot=month_ago + datetime.timedelta(days=2)),
+                                      has_more=False))['deleted']['comments'] == [comment.data['id']]
+
+    Tombstone.objects.update(created=month_ago)
+    call_command('prune_tombstones')
+    assert not Tombstone.objects.exists()
+
+    response = client.get(f'/goals/sync?cursor={encode_cursor(SyncPosition(None, month_ago), has_more=False)}')
+    assert response.status_code == 410
+    assert response.data['detail'].code == 'resync_required'
@@ -0,0 +1,49 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import User
+from goals.models import BoardParticipant, Goal, GoalComment
+
+URLS = ('/goals/goal/list', '/goals/goal/list?limit=100', '/goals/goal_category/list',
+        '/goals/goal_comment/list', '/goals/board/list')
+
+
+def count_queries(client, url):
+    # Measure the queries of the view, not of the response cache hits
+    cache.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+def add_rows(board_id, category_id, count):
+    """Adds goals and comments of different authors and participants of the board"""
+    users = User.objects.bulk_create([User(username=f'user {board_id} {i}') for i in range(count)])
+    BoardParticipant.objects.bulk_create([BoardParticipant(board_id=board_id, user=user, role=3) for user in users])
+    goals = Goal.objects.bulk_create([Goal(title='goal', user=user, category_id=category_id, board_id=board_id)
+                                      for user in users])
+    GoalComment.objects.bulk_create([GoalComment(text='comment', goal=goal, user=goal.user, board_id=board_id)
+                                     for goal in goals])
+
+
+@pytest.mark.django_db
+def test_list_queries_do_not_grow(client, create_goal):
+    """Testing that the list and detail endpoints cost a bounded number of queries"""
+    board_id = Goal.objects.get(pk=create_goal.data['id']).board_id
+    comment = client.post('/goals/goal_comment/create', {'text': 'comment', 'goal': create_goal.data['id']},
+                          content_type='application/json')
+    detail_urls = (f'/goals/board/{board_id}', f'/goals/goal/{create_goal.data["id"]}',
+                   f'/goals/goal_category/{create_goal.data["category"]}',
+                   f'/goals/goal_comment/{comment.data["id"]}')
+    for url in URLS + detail_urls:
+        client.get(url)
+
+    small = {url: count_queries(client, url) for url in URLS + detail_urls}
+    add_rows(board_id, create_goal.data['category'], 30)
+    client.get(f'/goals/board/{board_id}')
+    large = {url: count_queries(client, url) for url in URLS + detail_urls}
+
+    assert large == small
@@ -143,3 +143,67 @@ REST_FRAMEWORK = {
 }
 
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
+# Telegram API client shared by the bot and the API processes, see bot.tg.client.get_tg_client
+TG_API_URL = os.environ.get("TG_API_URL", "https://api.telegram.org")
+TG_POOL_SIZE = int(os.environ.get("TG_POOL_SIZE", 10))
+TG_CONNECT_TIMEOUT = float(os.environ.get("TG_CONNECT_TIMEOUT", 5))
+TG_READ_TIMEOUT = float(os.environ.get("TG_READ_TIMEOUT", 10))
+TG_RETRIES = int(os.environ.get("TG_RETRIES", 3))
+TG_BACKOFF = float(os.environ.get("TG_BACKOFF", 0.5))
+# A longer retry_after of Telegram fails the call instead of waiting
+TG_MAX_RETRY_DELAY = float(os.environ.get("TG_MAX_RETRY_DELAY", 10))
+# Chats handled at the same time by runbot, the updates of one chat are handled in order
+BOT_WORKERS = int(os.environ.get("BOT_WORKERS", 8))
+# Seconds between the throughput and backlog lines of runbot
+BOT_METRICS_INTERVAL = float(os.environ.get("BOT_METRICS_INTERVAL", 60))
+# "db" keeps the conversation states in the database for every bot process, "memory" in the process
+BOT_STATE_STORE = os.environ.get("BOT_STATE_STORE", "db")
+BOT_STATE_CACHE_SIZE = int(os.environ.get("BOT_STATE_CACHE_SIZE", 10000))
+BOT_STATE_TTL = float(os.environ.get("BOT_STATE_TTL", 24 * 60 * 60))
+BOT_STATE_BATCH_SIZE = int(os.environ.get("BOT_STATE_BATCH_SIZE", 100))
+BOT_STATE_FLUSH_INTERVAL = float(os.environ.get("BOT_STATE_FLUSH_INTERVAL", 1))
+# Outgoing telegram messages per second of the outbox sender, for all chats and for one chat
+OUTBOX_RATE = float(os.environ.get("OUTBOX_RATE", 25))
+OUTBOX_CHAT_RATE = float(os.environ.get("OUTBOX_CHAT_RATE", 1))
+# Messages sent to one chat at once before its rate applies
+OUTBOX_CHAT_BURST = int(os.environ.get("OUTBOX_CHAT_BURST", 3))
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_POLL_INTERVAL = float(os.environ.get("OUTBOX_POLL_INTERVAL", 1))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5))
+# Delay of the first retry of a failed message, doubled for every next one
+OUTBOX_RETRY_DELAY = float(os.environ.get("OUTBOX_RETRY_DELAY", 5))
+# Claimed messages not sent for this long are taken by another sender
+OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS", 60))
+# Public https url of bot/webhook given to telegram by `runbot --webhook`
+BOT_WEBHOOK_URL = os.environ.get("BOT_WEBHOOK_URL")
+# Secret telegram sends with every webhook call, the webhook is off without it
+BOT_WEBHOOK_SECRET = os.environ.get("BOT_WEBHOOK_SECRET")
+BOT_WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("BOT_WEBHOOK_MAX_CONNECTIONS", 40))
+BOT_WEBHOOK_POLL_INTERVAL = float(os.environ.get("BOT_WEBHOOK_POLL_INTERVAL", 0.5))
+# Handled updates are remembered this long to drop the ones telegram delivers again
+BOT_WEBHOOK_KEEP_SECONDS = int(os.environ.get("BOT_WEBHOOK_KEEP_SECONDS", 24 * 60 * 60))
+
+MEMBERSHIP_CACHE_TTL = int(os.environ.get("MEMBERSHIP_CACHE_TTL", 60))
+MEMBERSHIP_CACHE_MAX_BOARDS = int(os.environ.get("MEMBERSHIP_CACHE_MAX_BOARDS", 10000))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get("RESPONSE_CACHE_TIMEOUT", 300))
+# Changes written this long before a sync are sent again by the next sync
+SYNC_OVERLAP_SECONDS = int(os.environ.get("SYNC_OVERLAP_SECONDS", 5))
+# Objects of one sync response, the rest comes with the cursor of the response
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", 500))
+# Tombstones are pruned after this many days, older cursors get 410 and a full resync
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+IMPORT_MAX_CHUNK_SIZE = int(os.environ.get("IMPORT_MAX_CHUNK_SIZE", 10000))
+
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000))
+ARCHIVE_POLL_INTERVAL = float(os.environ.get("ARCHIVE_POLL_INTERVAL", 2))
+# A running job not updated for this long is taken over by another worker
+ARCHIVE_JOB_STALE_SECONDS = int(os.environ.get("ARCHIVE_JOB_STALE_SECONDS", 300))